@@ -0,0 +1,230 @@
+import hashlib
+import heapq
+import math
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
+from lxml import etree
+
+from http_cache import normalize_url
+from relevance import query_terms, tokenize
+from robots import can_fetch, iter_sitemap, sitemap_urls
+from scrape import CLEAN_MODE_TAGS, extract_and_clean, scrape_website_with_reason, split_dom_content
+
+# Links that never lead to HTML pages
+SKIPPED_EXTENSIONS = re.compile(
+    r"\.(jpe?g|png|gif|webp|svg|ico|bmp|pdf|zip|gz|tgz|rar|7z|exe|dmg|msi|mp3|mp4|avi|mov|webm|"
+    r"woff2?|ttf|eot|css|js|json|xml|rss|atom|docx?|xlsx?|pptx?|csv)$",
+    re.I,
+)
+MAX_FRONTIER = 100000           # Links waiting to be fetched; new ones are dropped beyond this
+LINK_MATCH_BONUS = 0.3          # Priority gained per description term in a link's URL or text
+SITEMAP_BATCH = 100             # Sitemap entries pulled into the frontier whenever it runs low
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership for URLs: memory is set by capacity and
+    error_rate, not by how many URLs are added. False positives (a new URL
+    reported as seen) happen at about error_rate once capacity is reached.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        # Double hashing: k positions from two 64-bit hashes
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Add an item; True if it was not (apparently) present before"""
+        new = False
+        for p in self._positions(item):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+
+def canonical_url(url: str, base_url: str = None):
+    """Absolute, normalized http(s) URL for a link, or None if it is not a crawlable page"""
+    url = url.strip()
+    if base_url:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    if SKIPPED_EXTENSIONS.search(parts.path):
+        return None
+    return normalize_url(url)
+
+
+def extract_links(html_content: str, base_url: str) -> list:
+    """(canonical URL, anchor text) for each followable <a href> in a page"""
+    try:
+        root = lxml.html.fromstring(html_content)
+    except (ValueError, etree.ParserError):
+        return []
+    base = root.find(".//base[@href]")
+    if base is not None:
+        base_url = urljoin(base_url, base.get("href"))
+
+    links = []
+    for anchor in root.iter("a"):
+        href = anchor.get("href")
+        if not href or "nofollow" in (anchor.get("rel") or "").lower():
+            continue
+        url = canonical_url(href, base_url)
+        if url:
+            links.append((url, " ".join(anchor.text_content().split())))
+    return links
+
+
+class Frontier:
+    """Priority queue of URLs to fetch: shallow and description-matching links first"""
+
+    def __init__(self, max_size: int = MAX_FRONTIER):
+        self.max_size = max_size
+        self._heap = []
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, url: str, depth: int, priority: float) -> bool:
+        if len(self._heap) >= self.max_size:
+            return False
+        # The counter keeps equal priorities in discovery order
+        heapq.heappush(self._heap, (priority, self._counter, url, depth))
+        self._counter += 1
+        return True
+
+    def pop(self):
+        """(url, depth) with the best priority"""
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+
+def _domain(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def crawl(start_urls, max_pages: int = 100, max_depth: int = 2, allowed_domains=None,
+          max_pages_per_domain: int = None, clean_mode: str = CLEAN_MODE_TAGS,
+          parse_description: str = None, model_name: str = None, router=None,
+          concurrency: int = 4, seen_capacity: int = 1_000_000, respect_robots: bool = True,
+          use_sitemaps: bool = False, modified_since=None):
+    """
+    Crawl outward from start_urls with scrape_website, following links up to
+    max_depth and stopping after max_pages pages. Only domains in
+    allowed_domains are followed (the start URLs' domains by default).
+    Seen URLs are kept in a Bloom filter, so memory does not grow with the
+    number of links found.
+
+    With respect_robots, robots.txt disallowed URLs are skipped and its
+    Crawl-delay paces each host. With use_sitemaps, the start hosts'
+    sitemaps are streamed into the frontier as it drains (as depth 1
+    pages); modified_since skips entries whose lastmod is older.
+
+    Yields a dict per page with url, depth, content (cleaned text), parsed
+    (model output when parse_description and model_name are given) and
+    error, in completion order.
+    """
+    if isinstance(start_urls, str):
+        start_urls = [start_urls]
+    seeds = [canonical_url(u if u.startswith(("http://", "https://")) else "https://" + u) for u in start_urls]
+    seeds = [u for u in seeds if u]
+    allowed = {_domain(d if "//" in d else "//" + d) for d in allowed_domains} if allowed_domains else {_domain(u) for u in seeds}
+    terms = set(query_terms(parse_description)) if parse_description else set()
+
+    seen = BloomFilter(seen_capacity)
+    frontier = Frontier()
+    per_domain = {}
+    for url in seeds:
+        if seen.add(url):
+            frontier.push(url, 0, 0.0)
+
+    def sitemap_pages():
+        for seed in seeds:
+            for sitemap in sitemap_urls(seed):
+                yield from iter_sitemap(sitemap, modified_since)
+
+    sitemap_feed = sitemap_pages() if use_sitemaps else None
+
+    def refill_from_sitemaps():
+        nonlocal sitemap_feed
+        for _ in range(SITEMAP_BATCH):
+            entry = next(sitemap_feed, None)
+            if entry is None:
+                sitemap_feed = None
+                return
+            url = canonical_url(entry[0])
+            if url and _domain(url) in allowed and seen.add(url):
+                frontier.push(url, 1, 1.0)
+
+    def priority(url: str, text: str, depth: int) -> float:
+        hits = len(terms & set(tokenize(url + " " + text))) if terms else 0
+        return depth - LINK_MATCH_BONUS * hits
+
+    def process(url: str, depth: int) -> dict:
+        page = {"url": url, "depth": depth, "content": None, "parsed": None, "error": None, "links": []}
+        try:
+            html, _ = scrape_website_with_reason(url)
+        except Exception as e:
+            page["error"] = str(e)
+            return page
+        if depth < max_depth:
+            page["links"] = extract_links(html, url)
+        page["content"] = extract_and_clean(html, clean_mode)
+        if parse_description and model_name and page["content"]:
+            # Imported here so crawling without a model does not need API credentials
+            from parse import chunk_token_budget, parse_with_external_ai
+            budget = router.chunk_token_budget() if router else chunk_token_budget(model_name)
+            chunks = split_dom_content(page["content"], max_tokens=budget)
+            page["parsed"] = parse_with_external_ai(chunks, parse_description, model_name, router=router)
+        return page
+
+    started = 0
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        running = set()
+        while True:
+            if sitemap_feed is not None and len(frontier) < max(concurrency, 1) * 2:
+                refill_from_sitemaps()
+            if not (running or (frontier and started < max_pages)):
+                break
+            while frontier and started < max_pages and len(running) < max(concurrency, 1):
+                url, depth = frontier.pop()
+                domain = _domain(url)
+                if max_pages_per_domain and per_domain.get(domain, 0) >= max_pages_per_domain:
+                    continue
+                if respect_robots and not can_fetch(url):
+                    print(f"🤖 Disallowed by robots.txt: {url}")
+                    continue
+                per_domain[domain] = per_domain.get(domain, 0) + 1
+                running.add(executor.submit(process, url, depth))
+                started += 1
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = future.result()
+                for link, text in page.pop("links"):
+                    if _domain(link) not in allowed or not seen.add(link):
+                        continue
+                    frontier.push(link, page["depth"] + 1, priority(link, text, page["depth"] + 1))
+                print(f"🕸️ Crawled {started}/{max_pages} (frontier {len(frontier)}): {page['url']}")
+                yield page
@@ -0,0 +1,128 @@
+import hashlib
+import re
+
+_DIGIT = re.compile(r"\d")
+_WORD = re.compile(r"\w+")
+
+SIMHASH_BITS = 64
+_BANDS = 4  # Pigeonhole: hashes within 3 bits share at least one 16-bit band
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word unigrams and bigrams"""
+    words = _WORD.findall(text.lower())
+    features = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def _bands(value: int):
+    width = SIMHASH_BITS // _BANDS
+    mask = (1 << width) - 1
+    return [(band, (value >> (band * width)) & mask) for band in range(_BANDS)]
+
+
+def dedupe_content(
+    text: str,
+    block_lines: int = 3,
+    min_block_chars: int = 40,
+    line_repeats: int = 3,
+    near_duplicates: bool = True,
+    near_min_chars: int = 40,
+    max_distance: int = 3,
+):
+    """
+    Collapse repeated boilerplate in cleaned page text before chunking.
+
+    - Blocks of `block_lines` consecutive lines (at least `min_block_chars`
+      long) that appeared before, such as a menu repeated in the footer,
+      when the repeated run is at least twice that long or the block occurs
+      `line_repeats` times or more.
+    - Lines without digits that occur `line_repeats` times or more ("Add to
+      cart"). A line seen only twice, or one with digits, is more likely a
+      field value shared by two records ("Bangalore, Karnataka, India")
+      and is kept so each record stays complete.
+    - With near_duplicates, digit-free lines of `near_min_chars` or more
+      whose SimHash is within `max_distance` bits of a line already kept.
+
+    The first occurrence is always kept. Returns (text, characters_saved).
+    """
+    lines = text.splitlines()
+    keys = [_normalize(line) for line in lines]
+    drop = [False] * len(lines)
+
+    # Repeated multi-line blocks
+    if block_lines > 1:
+        digests = [None] * len(keys)
+        block_counts = {}
+        for i in range(len(keys) - block_lines + 1):
+            block = tuple(keys[i : i + block_lines])
+            if sum(len(k) for k in block) < min_block_chars:
+                continue
+            digests[i] = hashlib.blake2b("\n".join(block).encode("utf-8"), digest_size=16).digest()
+            block_counts[digests[i]] = block_counts.get(digests[i], 0) + 1
+
+        seen_blocks = set()
+        repeated = [False] * len(keys)
+        for i, digest in enumerate(digests):
+            if digest is None:
+                continue
+            if digest in seen_blocks:
+                repeated[i] = True
+            else:
+                seen_blocks.add(digest)
+        for i, digest in enumerate(digests):
+            if not repeated[i]:
+                continue
+            # Two records may share a few field lines; a long repeated run or a
+            # block found in many places is boilerplate
+            long_run = (i >= block_lines and repeated[i - block_lines]) or (
+                i + block_lines < len(keys) and repeated[i + block_lines]
+            )
+            if long_run or block_counts[digest] >= line_repeats:
+                for j in range(i, i + block_lines):
+                    drop[j] = True
+
+    # Exact line repeats
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    seen_lines = set()
+    for i, key in enumerate(keys):
+        if drop[i] or not key:
+            continue
+        if key in seen_lines:
+            if counts[key] >= line_repeats and not _DIGIT.search(key):
+                drop[i] = True
+        else:
+            seen_lines.add(key)
+
+    # Near-duplicate long lines
+    if near_duplicates:
+        buckets = {}
+        for i, key in enumerate(keys):
+            # Lines with numbers are usually records, not boilerplate
+            if drop[i] or len(key) < near_min_chars or _DIGIT.search(key):
+                continue
+            value = simhash(key)
+            bands = _bands(value)
+            candidates = {c for band in bands for c in buckets.get(band, ())}
+            if any(bin(value ^ other).count("1") <= max_distance for other in candidates):
+                drop[i] = True
+                continue
+            for band in bands:
+                buckets.setdefault(band, []).append(value)
+
+    result = "\n".join(line for line, dropped in zip(lines, drop) if not dropped)
+    saved = len(text) - len(result)
+    if saved:
+        print(f"🧹 Removed {sum(drop)} repeated lines ({saved:,} characters)")
+    return result, saved
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+# Where per-domain strategy history is kept between runs
+STATS_PATH = os.environ.get("DOMAIN_STATS_PATH", ".domain_stats.json")
+
+HALF_LIFE = 6 * 3600        # Seconds for old outcomes to lose half their weight
+SKIP_AFTER_FAILURES = 3.0   # Decayed failures before a strategy is skipped
+LATENCY_SMOOTHING = 0.3     # Weight of the newest latency sample
+
+_stats = None
+_lock = threading.Lock()
+_save_lock = threading.Lock()
+
+
+def domain_of(url: str) -> str:
+    """Return the lowercase host a URL points at"""
+    return (urlparse(url).hostname or url).lower()
+
+
+def _load():
+    global _stats
+    if _stats is not None:
+        return _stats
+    try:
+        with open(STATS_PATH, "r", encoding="utf-8") as f:
+            _stats = json.load(f)
+    except (OSError, ValueError):
+        _stats = {}
+    return _stats
+
+
+def _decay(entry: dict, now: float):
+    """Fade an entry's counts according to how long ago it was updated"""
+    factor = 0.5 ** (max(now - entry.get("updated", now), 0) / HALF_LIFE)
+    entry["successes"] = entry.get("successes", 0.0) * factor
+    entry["failures"] = entry.get("failures", 0.0) * factor
+    reasons = entry.get("reasons", {})
+    entry["reasons"] = {k: v * factor for k, v in reasons.items() if v * factor >= 0.05}
+    entry["updated"] = now
+
+
+def record_attempt(url: str, strategy: str, success: bool, latency: float, reason: str = None):
+    """Record the outcome of one strategy attempt against a URL's domain"""
+    now = time.time()
+    with _lock:
+        domain = _load().setdefault(domain_of(url), {})
+        entry = domain.setdefault(strategy, {})
+        _decay(entry, now)
+
+        if success:
+            entry["successes"] += 1
+            previous = entry.get("latency")
+            entry["latency"] = latency if previous is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * previous
+            )
+        else:
+            entry["failures"] += 1
+            reason = reason or "unknown"
+            entry["reasons"][reason] = entry["reasons"].get(reason, 0.0) + 1
+
+
+def rank_strategies(url: str, strategies: list) -> list:
+    """
+    Order strategies by their decayed success rate on this domain,
+    dropping ones that keep failing. Unknown strategies keep their place.
+    At least one strategy is always returned.
+    """
+    now = time.time()
+    with _lock:
+        domain = _load().get(domain_of(url), {})
+        scored = []
+        for position, strategy in enumerate(strategies):
+            entry = domain.get(strategy.__name__)
+            if entry is None:
+                scored.append((0.5, 0.0, position, strategy, False))
+                continue
+            _decay(entry, now)
+            successes, failures = entry["successes"], entry["failures"]
+            rate = (successes + 1) / (successes + failures + 2)
+            failing = failures >= SKIP_AFTER_FAILURES and successes < 0.5
+            scored.append((rate, -entry.get("latency", 0.0), position, strategy, failing))
+
+    scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+    ranked = [item[3] for item in scored if not item[4]]
+    if not ranked:
+        ranked = [scored[0][3]]
+    return ranked
+
+
+def save_stats():
+    """Write the stats store to disk"""
+    # One writer at a time, so an older snapshot never replaces a newer one
+    with _save_lock:
+        with _lock:
+            data = json.dumps(_load())
+        # A temp file of our own, so other processes can't interleave writes into it
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(STATS_PATH) + ".", dir=os.path.dirname(STATS_PATH) or ".")
+        except OSError as e:
+            print(f"⚠️ Could not save domain stats: {e}")
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, STATS_PATH)
+        except OSError as e:
+            print(f"⚠️ Could not save domain stats: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def get_domain_stats(url: str) -> dict:
+    """Return a copy of the recorded stats for a URL's domain"""
+    with _lock:
+        return json.loads(json.dumps(_load().get(domain_of(url), {})))
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk fingerprints of cleaned pages and their chunks, with parse results
+STORE_PATH = os.environ.get("FINGERPRINT_PATH", ".fingerprints.sqlite")
+RESULT_TTL = int(os.environ.get("FINGERPRINT_TTL", 90 * 24 * 3600))
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"reused": 0, "missing": 0, "stored": 0}
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(STORE_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " url TEXT PRIMARY KEY, hash TEXT, chunk_hashes TEXT, updated REAL)"
+        )
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_results ("
+            " chunk_hash TEXT, description TEXT, model TEXT, result TEXT, updated REAL,"
+            " PRIMARY KEY (chunk_hash, description, model))"
+        )
+    return _conn
+
+
+def content_hash(text: str) -> str:
+    """Hash of text with whitespace differences ignored"""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def description_key(parse_description: str) -> str:
+    """Descriptions that differ only in case or spacing share results"""
+    return " ".join(parse_description.lower().split())
+
+
+def document_unchanged(url: str, text: str) -> bool:
+    """True if the cleaned text of url is the same as when it was last recorded"""
+    with _lock:
+        row = _db().execute("SELECT hash FROM documents WHERE url = ?", (url,)).fetchone()
+    return row is not None and row[0] == content_hash(text)
+
+
+def record_document(url: str, text: str, chunks: list):
+    """Remember the whole-document and per-chunk hashes of a page"""
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+            (url, content_hash(text), json.dumps([content_hash(c) for c in chunks]), time.time()),
+        )
+        db.commit()
+
+
+def changed_chunks(url: str, chunks: list) -> list:
+    """Indexes of chunks whose hash was not among the page's chunks last time"""
+    with _lock:
+        row = _db().execute("SELECT chunk_hashes FROM documents WHERE url = ?", (url,)).fetchone()
+    previous = set(json.loads(row[0])) if row else set()
+    return [i for i, chunk in enumerate(chunks) if content_hash(chunk) not in previous]
+
+
+def lookup_results(chunks: list, parse_description: str, model: str) -> dict:
+    """
+    {chunk index: stored result} for chunks parsed before with this
+    description by this model (a model name, or a router's model list)
+    """
+    key = description_key(parse_description)
+    cutoff = time.time() - RESULT_TTL
+    found = {}
+    with _lock:
+        db = _db()
+        for i, chunk in enumerate(chunks):
+            row = db.execute(
+                "SELECT result FROM chunk_results"
+                " WHERE chunk_hash = ? AND description = ? AND model = ? AND updated >= ?",
+                (content_hash(chunk), key, model, cutoff),
+            ).fetchone()
+            if row is not None:
+                found[i] = row[0]
+        _stats["reused"] += len(found)
+        _stats["missing"] += len(chunks) - len(found)
+    return found
+
+
+def store_results(chunks: list, results: list, parse_description: str, model: str):
+    """Save chunk results; failed ("❌ ...") results are not kept"""
+    key = description_key(parse_description)
+    now = time.time()
+    rows = [
+        (content_hash(chunk), key, model, result, now)
+        for chunk, result in zip(chunks, results)
+        if result is not None and not result.startswith("❌")
+    ]
+    with _lock:
+        db = _db()
+        db.executemany("INSERT OR REPLACE INTO chunk_results VALUES (?, ?, ?, ?, ?)", rows)
+        db.execute("DELETE FROM chunk_results WHERE updated < ?", (now - RESULT_TTL,))
+        db.commit()
+        _stats["stored"] += len(rows)
+
+
+def get_store_stats() -> dict:
+    """Reused, missing and stored chunk counters for this process"""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,204 @@
+import email.utils
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# On-disk store for fetched pages
+CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", ".http_cache.sqlite")
+CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+HEURISTIC_MAX_TTL = 24 * 3600   # Cap for freshness guessed from Last-Modified
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "revalidations": 0, "stores": 0, "evictions": 0}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key: lowercase scheme/host, no default port or fragment, sorted query"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, headers TEXT, body BLOB, encoding TEXT,"
+            " etag TEXT, last_modified TEXT, expires_at REAL, last_access REAL, size INTEGER)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+    return _conn
+
+
+def _cache_control(headers) -> dict:
+    directives = {}
+    for part in headers.get("Cache-Control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    return directives
+
+
+def _parse_date(value: str):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _expires_at(headers, now: float) -> float:
+    """When a response stops being fresh, from Cache-Control, Expires or Last-Modified"""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return now
+    if "max-age" in directives:
+        try:
+            return now + int(directives["max-age"])
+        except ValueError:
+            return now
+    expires = _parse_date(headers.get("Expires"))
+    if expires is not None:
+        date = _parse_date(headers.get("Date")) or now
+        return now + (expires - date)
+    last_modified = _parse_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        # Common heuristic: fresh for 10% of the time since the last change
+        return now + min(max(now - last_modified, 0) * 0.1, HEURISTIC_MAX_TTL)
+    return now
+
+
+def _count(key: str):
+    _stats[key] += 1
+
+
+def lookup(url: str):
+    """Return the cached entry for a URL as a dict, or None"""
+    with _lock:
+        row = _db().execute(
+            "SELECT headers, body, encoding, etag, last_modified, expires_at FROM pages WHERE key = ?",
+            (normalize_url(url),),
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "headers": json.loads(row[0]), "body": row[1], "encoding": row[2],
+        "etag": row[3], "last_modified": row[4], "expires_at": row[5],
+    }
+
+
+def is_fresh(entry: dict) -> bool:
+    return entry["expires_at"] > time.time()
+
+
+def conditional_headers(entry: dict) -> dict:
+    """Validators to send when revalidating a stale entry"""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def to_response(url: str, entry: dict) -> requests.Response:
+    """Rebuild a requests.Response from a cache entry"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = entry["encoding"]
+    response._content = entry["body"]
+    response.from_cache = True
+    return response
+
+
+def store(url: str, response: requests.Response):
+    """Save a 200 response unless it forbids storing"""
+    if response.status_code != 200 or getattr(response, "from_cache", False):
+        return
+    if "no-store" in _cache_control(response.headers):
+        return
+
+    now = time.time()
+    body = response.content
+    headers = dict(response.headers)
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                normalize_url(url), json.dumps(headers), body, response.encoding,
+                response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                _expires_at(response.headers, now), now, len(body),
+            ),
+        )
+        _count("stores")
+        _evict(db)
+        db.commit()
+
+
+def refresh(url: str, not_modified: requests.Response, entry: dict) -> requests.Response:
+    """Apply a 304 answer to a stale entry and return the cached page"""
+    now = time.time()
+    entry["headers"].update(not_modified.headers)
+    headers = CaseInsensitiveDict(entry["headers"])
+    with _lock:
+        db = _db()
+        db.execute(
+            "UPDATE pages SET headers = ?, etag = ?, last_modified = ?, expires_at = ?, last_access = ?"
+            " WHERE key = ?",
+            (
+                json.dumps(dict(headers)), headers.get("ETag"), headers.get("Last-Modified"),
+                _expires_at(headers, now), now, normalize_url(url),
+            ),
+        )
+        db.commit()
+        _count("revalidations")
+    return to_response(url, entry)
+
+
+def touch(url: str):
+    """Mark an entry as recently used and count the hit"""
+    with _lock:
+        db = _db()
+        db.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), normalize_url(url)))
+        db.commit()
+        _count("hits")
+
+
+def record_miss():
+    with _lock:
+        _count("misses")
+
+
+def _evict(db: sqlite3.Connection):
+    """Drop least recently used entries until the cache fits its size budget"""
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    for key, size in db.execute("SELECT key, size FROM pages ORDER BY last_access").fetchall():
+        db.execute("DELETE FROM pages WHERE key = ?", (key,))
+        _count("evictions")
+        total -= size
+        if total <= CACHE_MAX_BYTES:
+            break
+
+
+def get_cache_stats() -> dict:
+    """Hit, miss and revalidation counters for this process"""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk store for successful model responses
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite")
+CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, result TEXT,"
+            " created REAL, last_access REAL, size INTEGER)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+    return _conn
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """Model name plus a hash of the fully rendered prompt"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+def get(model_name: str, prompt: str):
+    """Return the cached response for this model and prompt, or None"""
+    key = cache_key(model_name, prompt)
+    now = time.time()
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT result, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > CACHE_TTL:
+            if row is not None:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+            _stats["misses"] += 1
+            return None
+        db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        db.commit()
+        _stats["hits"] += 1
+        return row[0]
+
+
+def put(model_name: str, prompt: str, result: str):
+    """Store a successful response and evict old entries past the size budget"""
+    now = time.time()
+    size = len(result.encode("utf-8"))
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (cache_key(model_name, prompt), model_name, result, now, now, size),
+        )
+        _stats["stores"] += 1
+        _evict(db, now)
+        db.commit()
+
+
+def _evict(db: sqlite3.Connection, now: float):
+    """Drop expired entries, then least recently used ones until under CACHE_MAX_BYTES"""
+    db.execute("DELETE FROM responses WHERE created < ?", (now - CACHE_TTL,))
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+        db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        _stats["evictions"] += 1
+        total -= size
+        if total <= CACHE_MAX_BYTES:
+            break
+
+
+def get_cache_stats() -> dict:
+    """Hit, miss, store and eviction counters for this process"""
+    with _lock:
+        return dict(_stats)
@@ -1,6 +1,17 @@
 import streamlit as st
-from scrape import scrape_website, split_dom_content, clean_body_content, extract_body_content
-from parse import parse_with_external_ai
+from scrape import (
+    scrape_website_with_reason, split_dom_content, split_content_defined, extract_and_clean, extract_body_content,
+    BLOCK_REASONS, REASON_JS_REQUIRED, CLEAN_MODE_MAIN, CLEAN_MODE_TAGS
+)
+from parse import (
+    stream_chunk_results, join_chunk_results, chunk_token_budget, label_columns,
+    ModelRouter, GROQ_MODELS_INFO
+)
+from relevance import select_relevant_chunks
+from dedup import dedupe_content
+from structured import extract_structured
+from crawler import crawl
+import fingerprints
 import time
 
 # Page config
@@ -16,6 +27,10 @@ if "theme" not in st.session_state:
     st.session_state.theme = "dark"
 if "dom_content" not in st.session_state:
     st.session_state.dom_content = None
+if "scraped_url" not in st.session_state:
+    st.session_state.scraped_url = None
+if "body_content" not in st.session_state:
+    st.session_state.body_content = None
 if "parsed_result" not in st.session_state:
     st.session_state.parsed_result = None
 if "scrape_status" not in st.session_state:
@@ -414,6 +429,19 @@ with col_main:
         placeholder="https://example.com",
         label_visibility="collapsed"
     )
+
+    main_content_only = st.checkbox(
+        "Main content only",
+        value=False,
+        help="Keep just the main article/content region, dropping sidebars, related links and footers found by text and link density."
+    )
+
+    with st.expander("🕸️ Crawl linked pages", expanded=False):
+        crawl_depth = st.number_input(
+            "Link depth", min_value=0, max_value=3, value=0,
+            help="How many links away from the URL to follow. 0 scrapes only the URL itself."
+        )
+        crawl_max_pages = st.number_input("Max pages", min_value=1, max_value=200, value=20)
     
     col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
     
@@ -431,27 +459,56 @@ with col_main:
             )
 
     # Scraping logic - FIXED INDENTATION
-    if scrape_clicked and url:
+    if scrape_clicked and url and crawl_depth:
+        with st.spinner(f"🕸️ Crawling up to {int(crawl_max_pages)} pages..."):
+            clean_mode = CLEAN_MODE_MAIN if main_content_only else CLEAN_MODE_TAGS
+            crawl_progress = st.empty()
+            sections, failed = [], 0
+            for page in crawl(url, max_pages=int(crawl_max_pages), max_depth=int(crawl_depth), clean_mode=clean_mode):
+                if page["content"]:
+                    sections.append(f"===== {page['url']} =====\n{page['content']}")
+                else:
+                    failed += 1
+                crawl_progress.caption(f"Crawled {len(sections) + failed} pages ({failed} failed)")
+            crawl_progress.empty()
+
+            if sections:
+                st.session_state.dom_content = "\n\n".join(sections)
+                # The table/list fast path works on a single page's DOM
+                st.session_state.body_content = None
+                st.session_state.scraped_url = url
+                st.session_state.scrape_status = "success"
+                st.success(f"✅ Crawled {len(sections)} pages" + (f" ({failed} failed)" if failed else ""))
+            else:
+                st.session_state.scrape_status = "error"
+                st.error("❌ No pages could be crawled")
+
+    elif scrape_clicked and url:
         with st.spinner("🔄 Scraping website (may take 10-20 seconds)..."):
             try:
-                result = scrape_website(url)
-                body_content = extract_body_content(result)
-                cleaned_content = clean_body_content(body_content)
+                result, scrape_reason = scrape_website_with_reason(url)
+                cleaned_content = extract_and_clean(
+                    result,
+                    CLEAN_MODE_MAIN if main_content_only else CLEAN_MODE_TAGS
+                )
                 
                 # Check if we got blocked or got limited content
                 if len(cleaned_content.strip()) < 500:
                     st.warning("⚠️ Limited content retrieved - site may have anti-bot protection")
-                elif any(blocked_indicator in cleaned_content.lower() for blocked_indicator in ['cloudflare', 'enable javascript', 'verification', 'security check', 'please complete the security check']):
+                elif scrape_reason == REASON_JS_REQUIRED:
                     st.warning("⚠️ Website has anti-bot protection. Content may be limited.")
                 
                 st.session_state.dom_content = cleaned_content
+                # Keep the DOM for the table/list fast path in the parse step
+                st.session_state.body_content = extract_body_content(result)
+                st.session_state.scraped_url = url
                 st.session_state.scrape_status = "success"
                 st.success("✅ Website scraped successfully!")
                 
             except Exception as e:
                 st.session_state.scrape_status = "error"
                 error_msg = str(e)
-                if "cloudflare" in error_msg.lower() or "challenge" in error_msg.lower() or "bot" in error_msg.lower():
+                if getattr(e, "reason", None) in BLOCK_REASONS:
                     st.error("❌ Website blocked the request with anti-bot protection")
                     st.info("💡 Try a different website or check if the site allows scraping")
                 else:
@@ -504,26 +561,7 @@ with col_main:
         </div>
         """, unsafe_allow_html=True)
 
-        # Groq Free Tier Models + Limits
-        groq_models_info = {
-        "groq/compound": {"RPM":30,"RPD":250,"TPM":70000,"TPD":None},
-        "groq/compound-mini": {"RPM":30,"RPD":250,"TPM":70000,"TPD":None},
-        "llama-3.1-8b-instant": {"RPM":30,"RPD":14400,"TPM":6000,"TPD":500000},
-        "llama-3.3-70b-versatile": {"RPM":30,"RPD":1000,"TPM":12000,"TPD":100000},
-        "meta-llama/llama-4-maverick-17b-128e-instruct": {"RPM":30,"RPD":1000,"TPM":6000,"TPD":500000},
-        "meta-llama/llama-4-scout-17b-16e-instruct": {"RPM":30,"RPD":1000,"TPM":30000,"TPD":500000},
-        "meta-llama/llama-guard-4-12b": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
-        "meta-llama/llama-prompt-guard-2-22m": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
-        "meta-llama/llama-prompt-guard-2-86m": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
-        "moonshotai/kimi-k2-instruct": {"RPM":60,"RPD":1000,"TPM":10000,"TPD":300000},
-        "moonshotai/kimi-k2-instruct-0905": {"RPM":60,"RPD":1000,"TPM":10000,"TPD":300000},
-        "openai/gpt-oss-120b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
-        "openai/gpt-oss-20b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
-        "openai/gpt-oss-safeguard-20b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
-        "qwen/qwen3-32b": {"RPM":60,"RPD":1000,"TPM":6000,"TPD":500000},
-    }
-
-        model_names = list(groq_models_info.keys())
+        model_names = list(GROQ_MODELS_INFO.keys())
 
         selected_model = st.selectbox(
             "Choose AI Model (Groq Free Tier)",
@@ -532,7 +570,22 @@ with col_main:
             help="Pick which Groq model you want the parser to use."
         )
 
-        limits = groq_models_info[selected_model]
+        fallback_models = st.multiselect(
+            "Fallback models (in order of preference)",
+            [name for name in model_names if name != selected_model],
+            help="When the chosen model is out of quota or failing, chunks go to the first fallback that can take them."
+        )
+
+        # One router per model list, so its latency history survives reruns
+        router = None
+        if fallback_models:
+            routed_models = [selected_model] + fallback_models
+            existing = st.session_state.get("model_router")
+            if existing is None or existing.models != routed_models:
+                st.session_state.model_router = ModelRouter(routed_models)
+            router = st.session_state.model_router
+
+        limits = GROQ_MODELS_INFO[selected_model]
         rpm = limits.get("RPM")
         rpd = limits.get("RPD")
         tpm = limits.get("TPM")
@@ -584,6 +637,42 @@ with col_main:
             placeholder="e.g., Extract all product names and prices as a markdown table with columns Item Name and Price...",
             height=100
         )
+
+        remove_boilerplate = st.checkbox(
+            "Remove repeated boilerplate (menus, banners, card text)",
+            value=False,
+            help="Collapses repeated and near-duplicate lines before the content is sent to the AI."
+        )
+
+        direct_tables = st.checkbox(
+            "Extract tables and lists directly when possible",
+            value=True,
+            help="Table and list requests are answered from the page structure; the AI is only asked to pick columns."
+        )
+
+        skip_unrelated = st.checkbox(
+            "Skip chunks unrelated to the request",
+            value=True,
+            help="Chunks that share no words with your request (and are not next to ones that do) are not sent to the AI."
+        )
+
+        reuse_results = st.checkbox(
+            "Reuse results for unchanged content",
+            value=True,
+            help="Chunks that were parsed before with the same request reuse their results; only new or changed text goes to the AI."
+        )
+
+        stable_chunks = st.checkbox(
+            "Keep chunk boundaries stable between scrapes",
+            value=False,
+            help="Lets the text choose where chunks end, so an edit only changes the chunks around it and more results can be reused. Uses a few more, slightly smaller chunks."
+        )
+
+        pack_chunks = st.checkbox(
+            "Pack small chunks into shared requests",
+            value=True,
+            help="Sends several small chunks in one request up to the model's token budget, saving requests per minute."
+        )
         
         col_parse1, col_parse2, col_parse3 = st.columns([1, 1, 2])
         
@@ -603,9 +692,58 @@ with col_main:
         if parse_clicked and parse_description:
             with st.spinner(f"🧠 AI ({selected_model}) is analyzing content..."):
                 try:
-                    dom_chunks = split_dom_content(st.session_state.dom_content)
-                    result = parse_with_external_ai(dom_chunks, parse_description, selected_model)
-                    st.session_state.parsed_result = result
+                    structured_result = None
+                    if direct_tables and st.session_state.body_content:
+                        structured_result = extract_structured(
+                            st.session_state.body_content,
+                            parse_description,
+                            lambda headers, rows, description: label_columns(
+                                headers, rows, description, selected_model
+                            )
+                        )
+                    if structured_result:
+                        st.session_state.parsed_result = structured_result
+                        st.success("⚡ Extracted directly from the page's table/list structure")
+                    else:
+                        content_to_parse = st.session_state.dom_content
+                        if remove_boilerplate:
+                            content_to_parse, saved_chars = dedupe_content(content_to_parse)
+                            if saved_chars:
+                                st.info(f"🧹 Removed {saved_chars:,} characters of repeated text")
+                        # Content-defined cuts keep unchanged text in identical chunks between scrapes
+                        split = split_content_defined if reuse_results and stable_chunks else split_dom_content
+                        dom_chunks = split(
+                            content_to_parse,
+                            max_tokens=router.chunk_token_budget() if router else chunk_token_budget(selected_model)
+                        )
+                        page_key = st.session_state.scraped_url
+                        if reuse_results and page_key:
+                            if fingerprints.document_unchanged(page_key, content_to_parse):
+                                st.info("♻️ Page unchanged since it was last parsed")
+                            else:
+                                changed = fingerprints.changed_chunks(page_key, dom_chunks)
+                                if len(changed) < len(dom_chunks):
+                                    st.info(f"♻️ {len(changed)} of {len(dom_chunks)} chunks changed since the last parse")
+                            fingerprints.record_document(page_key, content_to_parse, dom_chunks)
+                        if skip_unrelated:
+                            relevant_chunks = select_relevant_chunks(dom_chunks, parse_description)
+                            if len(relevant_chunks) < len(dom_chunks):
+                                st.info(f"🎯 Sending {len(relevant_chunks)} of {len(dom_chunks)} chunks that match your description")
+                            dom_chunks = relevant_chunks
+                        # Show answers as they are generated instead of after the last chunk
+                        chunk_results = [""] * len(dom_chunks)
+                        live_output = st.empty()
+                        for number, text, done in stream_chunk_results(
+                            dom_chunks, parse_description, selected_model, pack=pack_chunks, router=router,
+                            reuse=reuse_results
+                        ):
+                            chunk_results[number - 1] = text
+                            st.session_state.parsed_result = "\n\n".join(
+                                r for r in chunk_results if r and not r.startswith("❌")
+                            )
+                            live_output.markdown(st.session_state.parsed_result)
+                        live_output.empty()
+                        st.session_state.parsed_result = join_chunk_results(chunk_results)
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
         
@@ -1,8 +1,18 @@
+import email.utils
 import os
 import openai
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 import re
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fingerprints
+import llm_cache
+from tokens import chars_for_tokens, estimate_tokens
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -22,15 +32,224 @@ template = (
     "4. **Direct Data Only:** Your output should contain only the data that is explicitly requested, with no other text."
 )
 
+# Several chunks in one request; answers are labelled per section so they
+# can be traced back to the chunk they came from
+packed_template = (
+    "You are tasked with extracting specific information from several sections of text content. "
+    "Each section starts with a line like '=== SECTION 1 ==='.\n\n{sections}\n\n"
+    "Please follow these instructions carefully: \n\n"
+    "1. **Extract Information:** Only extract the information that directly matches the provided description: {parse_description}. "
+    "2. **Label Sections:** For each section that contains matching information, write a line '### SECTION <number>' followed by the data from that section. "
+    "3. **Skip Empty Sections:** Leave out sections with no matching information entirely. "
+    "4. **Direct Data Only:** Do not include any additional text, comments, or explanations in your response."
+)
+
+SYSTEM_PROMPT = "You are a precise data extraction assistant. Return only the requested data, no explanations."
+
+# Groq Free Tier Models + Limits
+GROQ_MODELS_INFO = {
+    "groq/compound": {"RPM":30,"RPD":250,"TPM":70000,"TPD":None},
+    "groq/compound-mini": {"RPM":30,"RPD":250,"TPM":70000,"TPD":None},
+    "llama-3.1-8b-instant": {"RPM":30,"RPD":14400,"TPM":6000,"TPD":500000},
+    "llama-3.3-70b-versatile": {"RPM":30,"RPD":1000,"TPM":12000,"TPD":100000},
+    "meta-llama/llama-4-maverick-17b-128e-instruct": {"RPM":30,"RPD":1000,"TPM":6000,"TPD":500000},
+    "meta-llama/llama-4-scout-17b-16e-instruct": {"RPM":30,"RPD":1000,"TPM":30000,"TPD":500000},
+    "meta-llama/llama-guard-4-12b": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
+    "meta-llama/llama-prompt-guard-2-22m": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
+    "meta-llama/llama-prompt-guard-2-86m": {"RPM":30,"RPD":14400,"TPM":15000,"TPD":500000},
+    "moonshotai/kimi-k2-instruct": {"RPM":60,"RPD":1000,"TPM":10000,"TPD":300000},
+    "moonshotai/kimi-k2-instruct-0905": {"RPM":60,"RPD":1000,"TPM":10000,"TPD":300000},
+    "openai/gpt-oss-120b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
+    "openai/gpt-oss-20b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
+    "openai/gpt-oss-safeguard-20b": {"RPM":30,"RPD":1000,"TPM":8000,"TPD":200000},
+    "qwen/qwen3-32b": {"RPM":60,"RPD":1000,"TPM":6000,"TPD":500000},
+}
+
+MAX_OUTPUT_TOKENS = 2000
+MAX_CHUNK_TOKENS = 6000         # Upper bound even for high-TPM models, to keep extraction focused
+DESCRIPTION_ALLOWANCE = 200     # Tokens reserved for the user's parse description
+PROMPT_OVERHEAD_TOKENS = estimate_tokens(template + SYSTEM_PROMPT) + DESCRIPTION_ALLOWANCE
+MAX_PACKED_CHUNKS = 8           # Answers for all sections share MAX_OUTPUT_TOKENS
+SECTION_DELIMITER_TOKENS = 10   # '=== SECTION n ===' line plus spacing
+
+
+def chunk_token_budget(model_name: str) -> int:
+    """
+    Content tokens one chunk may use so a single request (prompt, content
+    and reserved output) fits inside the model's tokens-per-minute limit.
+    """
+    tpm = GROQ_MODELS_INFO.get(model_name, {}).get("TPM") or MAX_CHUNK_TOKENS
+    budget = tpm - MAX_OUTPUT_TOKENS - PROMPT_OVERHEAD_TOKENS
+    return max(min(budget, MAX_CHUNK_TOKENS), 500)
+
+
+# ======================
+# Rate limiting
+# ======================
+
+# Daily request/token counters survive restarts here
+USAGE_PATH = os.environ.get("GROQ_USAGE_PATH", ".groq_usage.json")
+
+
+class QuotaExceeded(Exception):
+    """A model's daily request or token quota is used up"""
+
+
+class _TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
 
-def build_prompt(dom_content: str, parse_description: str) -> str:
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Keeps calls under each model's RPM/TPM with token buckets and under
+    RPD/TPD with daily counters persisted to USAGE_PATH. Callers block in
+    acquire() until their request fits instead of being rejected with 429.
+    """
+
+    def __init__(self, limits: dict, usage_path: str = USAGE_PATH):
+        self.limits = limits
+        self.usage_path = usage_path
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._usage = self._load_usage()
+
+    def _load_usage(self) -> dict:
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_usage(self):
+        tmp_path = self.usage_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._usage, f)
+            os.replace(tmp_path, self.usage_path)
+        except OSError as e:
+            print(f"⚠️ Could not save Groq usage: {e}")
+
+    def _today(self, model_name: str) -> dict:
+        """Today's counters for a model (UTC day), reset when the day changes"""
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        if self._usage.get("date") != today:
+            self._usage = {"date": today, "models": {}}
+        return self._usage["models"].setdefault(model_name, {"requests": 0, "tokens": 0})
+
+    def _model_buckets(self, model_name: str):
+        if model_name not in self._buckets:
+            limits = self.limits.get(model_name, {})
+            self._buckets[model_name] = (
+                _TokenBucket(limits["RPM"]) if limits.get("RPM") else None,
+                _TokenBucket(limits["TPM"]) if limits.get("TPM") else None,
+            )
+        return self._buckets[model_name]
+
+    def remaining_today(self, model_name: str) -> dict:
+        """Requests and tokens left today, None where the model has no daily limit"""
+        limits = self.limits.get(model_name, {})
+        with self._lock:
+            used = dict(self._today(model_name))
+        return {
+            "requests": None if limits.get("RPD") is None else max(limits["RPD"] - used["requests"], 0),
+            "tokens": None if limits.get("TPD") is None else max(limits["TPD"] - used["tokens"], 0),
+        }
+
+    def acquire(self, model_name: str, tokens: int, block: bool = True) -> bool:
+        """
+        Block until one request of `tokens` fits the model's limits, then
+        reserve it. With block=False, return False instead of waiting.
+        """
+        limits = self.limits.get(model_name, {})
+        while True:
+            with self._lock:
+                used = self._today(model_name)
+                if limits.get("RPD") is not None and used["requests"] + 1 > limits["RPD"]:
+                    raise QuotaExceeded(f"Daily request limit ({limits['RPD']}) reached for {model_name}")
+                if limits.get("TPD") is not None and used["tokens"] + tokens > limits["TPD"]:
+                    raise QuotaExceeded(f"Daily token limit ({limits['TPD']}) reached for {model_name}")
+
+                requests_bucket, tokens_bucket = self._model_buckets(model_name)
+                now = time.monotonic()
+                wait = max(
+                    requests_bucket.wait_time(1, now) if requests_bucket else 0.0,
+                    tokens_bucket.wait_time(tokens, now) if tokens_bucket else 0.0,
+                )
+                if wait <= 0:
+                    if requests_bucket:
+                        requests_bucket.take(1)
+                    if tokens_bucket:
+                        tokens_bucket.take(tokens)
+                    used["requests"] += 1
+                    used["tokens"] += tokens
+                    self._save_usage()
+                    return True
+            if not block:
+                return False
+            print(f"⏳ {model_name}: waiting {wait:.1f}s to stay under rate limits")
+            time.sleep(wait)
+
+    def settle(self, model_name: str, reserved: int, actual: int):
+        """Correct a reservation once the API reports the tokens really used"""
+        if actual is None or actual == reserved:
+            return
+        with self._lock:
+            _, tokens_bucket = self._model_buckets(model_name)
+            if tokens_bucket:
+                tokens_bucket.give_back(reserved - actual)
+            used = self._today(model_name)
+            used["tokens"] = max(used["tokens"] - reserved + actual, 0)
+            self._save_usage()
+
+    def release(self, model_name: str, reserved: int):
+        """Undo a reservation whose request failed before the model answered"""
+        with self._lock:
+            requests_bucket, tokens_bucket = self._model_buckets(model_name)
+            if requests_bucket:
+                requests_bucket.give_back(1)
+            if tokens_bucket:
+                tokens_bucket.give_back(reserved)
+            used = self._today(model_name)
+            used["requests"] = max(used["requests"] - 1, 0)
+            used["tokens"] = max(used["tokens"] - reserved, 0)
+            self._save_usage()
+
+
+rate_limiter = RateLimiter(GROQ_MODELS_INFO)
+
+
+def build_prompt(dom_content: str, parse_description: str, max_length: int = 12000) -> str:
     """
     Render the prompt from the template using LangChain's ChatPromptTemplate.
     """
     prompt = ChatPromptTemplate.from_template(template)
     
     # Clean the content before sending to AI
-    cleaned_content = clean_content_for_ai(dom_content)
+    cleaned_content = clean_content_for_ai(dom_content, max_length)
     
     rendered = prompt.format(
         dom_content=cleaned_content,
@@ -39,6 +258,81 @@ def build_prompt(dom_content: str, parse_description: str) -> str:
     return rendered
 
 
+def build_packed_prompt(numbered_chunks, parse_description: str, max_length: int = 12000) -> str:
+    """
+    Render one prompt holding several (number, chunk) sections.
+    max_length applies to the combined content of all sections; when the
+    sections do not fit, each is cut in proportion to its length.
+    """
+    prompt = ChatPromptTemplate.from_template(packed_template)
+    total = sum(len(chunk) for _, chunk in numbered_chunks) or 1
+    scale = min(max_length / total, 1.0)
+    sections = "\n\n".join(
+        f"=== SECTION {number} ===\n{clean_content_for_ai(chunk, max(int(len(chunk) * scale), 1))}"
+        for number, chunk in numbered_chunks
+    )
+    return prompt.format(sections=sections, parse_description=parse_description)
+
+
+# The '### SECTION <number>' label the packed prompt asks for, alone on its line
+_SECTION_HEADER = re.compile(r"^[ \t]*###[ \t]*SECTION[ \t]+(\d+)[ \t]*:?[ \t]*$", re.I | re.M)
+
+
+def _section_labels(result: str, numbers) -> list:
+    """Label matches naming a section in the pack; any other line is content"""
+    return [header for header in _SECTION_HEADER.finditer(result) if int(header.group(1)) in numbers]
+
+
+def split_packed_result(result: str, numbers) -> dict:
+    """
+    Split a packed answer back into {section number: text}. Sections the
+    model left out, or answered with nothing, are missing from the dict.
+    An answer without any section labels is kept whole under the first
+    section rather than dropped.
+    """
+    numbers = sorted(set(numbers))
+    headers = _section_labels(result, numbers)
+    if not headers:
+        return {numbers[0]: result.strip()} if numbers and result.strip() else {}
+
+    sections = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        number = int(header.group(1))
+        end = following.start() if following else len(result)
+        text = result[header.end():end].strip()
+        if text and text not in ("''", '""'):
+            sections[number] = (sections[number] + "\n" + text) if number in sections else text
+    return sections
+
+
+def pack_chunks(dom_chunks, model_name: str, token_budget: int = None) -> list:
+    """
+    Group consecutive chunks so each group fits one request within the
+    model's chunk token budget (or `token_budget`). Returns lists of
+    (number, chunk), numbered from 1 in the original chunk order.
+    """
+    if token_budget is None:
+        token_budget = chunk_token_budget(model_name)
+    return _pack_numbered(list(enumerate(dom_chunks, start=1)), token_budget)
+
+
+def _pack_numbered(numbered_chunks: list, token_budget: int) -> list:
+    budget = token_budget - (
+        estimate_tokens(packed_template) - estimate_tokens(template)
+    )
+    packs, current, used = [], [], 0
+    for number, chunk in numbered_chunks:
+        cost = estimate_tokens(chunk) + SECTION_DELIMITER_TOKENS
+        if current and (used + cost > budget or len(current) >= MAX_PACKED_CHUNKS):
+            packs.append(current)
+            current, used = [], 0
+        current.append((number, chunk))
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
 def clean_content_for_ai(content: str, max_length: int = 12000) -> str:
     """
     Clean and prepare content for AI processing
@@ -59,32 +353,383 @@ def clean_content_for_ai(content: str, max_length: int = 12000) -> str:
     return cleaned.strip()
 
 
-def call_groq_model(prompt: str, model_name: str) -> str:
+GARBLED_MESSAGE = "❌ Unable to extract information. The website content may not contain relevant data or may be in an unsupported format."
+
+
+def _messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _total_tokens(usage):
+    """total_tokens from an OpenAI usage object or Groq's x_groq usage dict"""
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return getattr(usage, "total_tokens", None)
+
+
+def _finish_response(model_name: str, cache_text: str, result: str, validate: bool = True) -> str:
+    """Validate a completed answer and cache it when it is usable"""
+    if (validate and is_garbled_response(result)) or not result:
+        return GARBLED_MESSAGE
+    llm_cache.put(model_name, cache_text, result)
+    return result
+
+
+def _completion(prompt: str, model_name: str, api_client=None):
+    """One chat completion as (text, total_tokens); API errors are raised"""
+    response = (api_client or client).chat.completions.create(
+        model=model_name,
+        messages=_messages(prompt),
+        temperature=0.0,
+        max_tokens=MAX_OUTPUT_TOKENS
+    )
+    text = (response.choices[0].message.content or "").strip()
+    return text, _total_tokens(getattr(response, "usage", None))
+
+
+def _stream_completion(prompt: str, model_name: str, usage: dict, api_client=None):
+    """
+    Yield the answer so far as a streamed completion arrives and store
+    usage["total_tokens"] when reported. API errors are raised.
+    """
+    stream = (api_client or client).chat.completions.create(
+        model=model_name,
+        messages=_messages(prompt),
+        temperature=0.0,
+        max_tokens=MAX_OUTPUT_TOKENS,
+        stream=True
+    )
+    parts = []
+    for chunk in stream:
+        # Usage arrives on the last chunk, under x_groq on Groq
+        x_groq = getattr(chunk, "x_groq", None)
+        reported = getattr(chunk, "usage", None) or (x_groq.get("usage") if isinstance(x_groq, dict) else getattr(x_groq, "usage", None))
+        if reported is not None:
+            usage["total_tokens"] = _total_tokens(reported)
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield "".join(parts)
+
+
+def call_groq_model(prompt: str, model_name: str, validate: bool = True) -> str:
     """
     Call Groq-hosted model using OpenAI-compatible client.
+    Answers are served from the local response cache when possible;
+    otherwise waits for the model's rate limits before sending.
+    validate=False skips the garbled-text check for short structured answers.
     """
+    cache_text = SYSTEM_PROMPT + "\n" + prompt
+    cached = llm_cache.get(model_name, cache_text)
+    if cached is not None:
+        print(f"💾 Cached response from {model_name}")
+        return cached
+
+    # Prompt and system message plus the completion we allow
+    reserved = estimate_tokens(SYSTEM_PROMPT + prompt) + MAX_OUTPUT_TOKENS
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are a precise data extraction assistant. Return only the requested data, no explanations."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.0,
-            max_tokens=2000
-        )
-        result = (response.choices[0].message.content or "").strip()
-        
-        # Validate the response
-        if is_garbled_response(result):
-            return "❌ Unable to extract information. The website content may not contain relevant data or may be in an unsupported format."
-        
-        return result
+        rate_limiter.acquire(model_name, reserved)
+    except QuotaExceeded as e:
+        return f"❌ {e}"
+
+    try:
+        result, total_tokens = _completion(prompt, model_name)
+        rate_limiter.settle(model_name, reserved, total_tokens)
+        return _finish_response(model_name, cache_text, result, validate)
         
     except Exception as e:
+        # Nothing was answered, so the request does not count against the quota
+        rate_limiter.release(model_name, reserved)
         return f"❌ Error calling AI model: {str(e)}"
 
 
+def stream_groq_model(prompt: str, model_name: str):
+    """
+    Streaming variant of call_groq_model. Yields (text_so_far, False) as
+    tokens arrive, then exactly one (result, True) carrying the validated
+    answer or "❌ ..." message, as call_groq_model would have returned it.
+    """
+    cache_text = SYSTEM_PROMPT + "\n" + prompt
+    cached = llm_cache.get(model_name, cache_text)
+    if cached is not None:
+        print(f"💾 Cached response from {model_name}")
+        yield cached, True
+        return
+
+    reserved = estimate_tokens(SYSTEM_PROMPT + prompt) + MAX_OUTPUT_TOKENS
+    try:
+        rate_limiter.acquire(model_name, reserved)
+    except QuotaExceeded as e:
+        yield f"❌ {e}", True
+        return
+
+    usage = {}
+    text = ""
+    try:
+        for text in _stream_completion(prompt, model_name, usage):
+            yield text, False
+    except Exception as e:
+        if not text:
+            # Failed before any answer, so the request does not count against the quota
+            rate_limiter.release(model_name, reserved)
+        yield f"❌ Error calling AI model: {str(e)}", True
+        return
+
+    rate_limiter.settle(model_name, reserved, usage.get("total_tokens"))
+    yield _finish_response(model_name, cache_text, text.strip()), True
+
+
+# ======================
+# Model routing
+# ======================
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_COOLDOWN = 30.0         # Seconds a failing model is skipped without Retry-After
+MAX_COOLDOWN_WAIT = 60.0        # Longest we wait for a cooling-down model when all are
+ROUTER_LATENCY_SMOOTHING = 0.3
+SLOW_MODEL_FACTOR = 3.0         # Demote models this many times slower than the fastest
+
+
+def _error_status(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable_error(error) -> bool:
+    """Rate limits, server errors and connection problems are worth another model"""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return _error_status(error) in RETRYABLE_STATUS
+
+
+def retry_after_seconds(error, default: float = DEFAULT_COOLDOWN) -> float:
+    """Seconds from an error's Retry-After header (seconds or HTTP date)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError, IndexError):
+                pass
+    return default
+
+
+class ModelRouter:
+    """
+    Sends each request to the best model in a ranked list that still has
+    quota. Models that answer 429/5xx are skipped for their Retry-After
+    period and the request moves on to the next model; models much slower
+    than the fastest one seen are tried after the others.
+    """
+
+    def __init__(self, models: list, limiter: RateLimiter = rate_limiter):
+        self.models = list(dict.fromkeys(models))
+        self.limiter = limiter
+        # Fail fast on 429/5xx and let the router pick another model instead
+        self._client = client.with_options(max_retries=0)
+        self._lock = threading.Lock()
+        self._stats = {
+            model: {"requests": 0, "failures": 0, "latency": None, "cooldown_until": 0.0}
+            for model in self.models
+        }
+
+    def chunk_token_budget(self) -> int:
+        """A chunk size every model in the list can take"""
+        return min(chunk_token_budget(model) for model in self.models)
+
+    def _has_quota(self, model_name: str, tokens: int) -> bool:
+        remaining = self.limiter.remaining_today(model_name)
+        return remaining["requests"] != 0 and (remaining["tokens"] is None or remaining["tokens"] >= tokens)
+
+    def candidates(self, tokens: int) -> list:
+        """Models to try for a request of `tokens`, best first"""
+        now = time.monotonic()
+        with self._lock:
+            latencies = [s["latency"] for s in self._stats.values() if s["latency"] is not None]
+            fastest = min(latencies, default=None)
+            ready = [
+                model for model in self.models
+                if self._stats[model]["cooldown_until"] <= now and self._has_quota(model, tokens)
+            ]
+
+            def slow(model):
+                latency = self._stats[model]["latency"]
+                return fastest is not None and latency is not None and latency > fastest * SLOW_MODEL_FACTOR
+
+            return sorted(ready, key=slow)
+
+    def _cooldown_wait(self, tokens: int):
+        """Seconds until the first cooling-down model with quota is usable again, or None"""
+        now = time.monotonic()
+        with self._lock:
+            waits = [
+                s["cooldown_until"] - now for model, s in self._stats.items()
+                if s["cooldown_until"] > now and self._has_quota(model, tokens)
+            ]
+        return min(waits, default=None)
+
+    def _acquire(self, tokens: int):
+        """Reserve a request on the best model, waiting only if every model is busy"""
+        while True:
+            candidates = self.candidates(tokens)
+            for model in candidates:
+                try:
+                    if self.limiter.acquire(model, tokens, block=False):
+                        return model
+                except QuotaExceeded:
+                    continue
+            for model in candidates:
+                try:
+                    self.limiter.acquire(model, tokens)
+                    return model
+                except QuotaExceeded:
+                    continue
+            wait = self._cooldown_wait(tokens)
+            if wait is None or wait > MAX_COOLDOWN_WAIT:
+                return None
+            print(f"⏳ All models cooling down, retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+    def record(self, model_name: str, latency: float = None, error=None):
+        """Track latency of successful calls and cool down models that failed"""
+        with self._lock:
+            stats = self._stats[model_name]
+            stats["requests"] += 1
+            if error is not None:
+                stats["failures"] += 1
+                stats["cooldown_until"] = time.monotonic() + retry_after_seconds(error)
+            elif latency is not None:
+                previous = stats["latency"]
+                stats["latency"] = latency if previous is None else (
+                    previous + ROUTER_LATENCY_SMOOTHING * (latency - previous)
+                )
+
+    def get_model_stats(self) -> dict:
+        with self._lock:
+            return {model: dict(stats) for model, stats in self._stats.items()}
+
+    def _cached(self, cache_text: str):
+        for model in self.models:
+            cached = llm_cache.get(model, cache_text)
+            if cached is not None:
+                print(f"💾 Cached response from {model}")
+                return cached
+        return None
+
+    def _failed(self, model_name: str, reserved: int, error) -> bool:
+        """Handle a call that failed before any answer; True if the request should move to another model"""
+        # The request was refused, so it does not count against the quota
+        self.limiter.release(model_name, reserved)
+        if not is_retryable_error(error):
+            return False
+        self.record(model_name, error=error)
+        print(f"🔀 {model_name} failed ({_error_status(error) or type(error).__name__}), switching model")
+        return True
+
+    def call(self, prompt: str) -> str:
+        """call_groq_model with failover across the ranked models"""
+        cache_text = SYSTEM_PROMPT + "\n" + prompt
+        cached = self._cached(cache_text)
+        if cached is not None:
+            return cached
+
+        reserved = estimate_tokens(SYSTEM_PROMPT + prompt) + MAX_OUTPUT_TOKENS
+        last_error = None
+        for _ in range(len(self.models) * 2):
+            model = self._acquire(reserved)
+            if model is None:
+                break
+            start = time.monotonic()
+            try:
+                result, total_tokens = _completion(prompt, model, self._client)
+            except Exception as e:
+                last_error = e
+                if self._failed(model, reserved, e):
+                    continue
+                return f"❌ Error calling AI model: {str(e)}"
+            self.record(model, latency=time.monotonic() - start)
+            self.limiter.settle(model, reserved, total_tokens)
+            return _finish_response(model, cache_text, result)
+        return f"❌ No model with remaining quota could answer{f': {last_error}' if last_error else ''}"
+
+    def stream(self, prompt: str):
+        """stream_groq_model with failover, as long as no text has arrived yet"""
+        cache_text = SYSTEM_PROMPT + "\n" + prompt
+        cached = self._cached(cache_text)
+        if cached is not None:
+            yield cached, True
+            return
+
+        reserved = estimate_tokens(SYSTEM_PROMPT + prompt) + MAX_OUTPUT_TOKENS
+        last_error = None
+        for _ in range(len(self.models) * 2):
+            model = self._acquire(reserved)
+            if model is None:
+                break
+            start = time.monotonic()
+            usage = {}
+            text = ""
+            try:
+                for text in _stream_completion(prompt, model, usage, self._client):
+                    yield text, False
+            except Exception as e:
+                last_error = e
+                if not text and self._failed(model, reserved, e):
+                    continue
+                yield f"❌ Error calling AI model: {str(e)}", True
+                return
+            self.record(model, latency=time.monotonic() - start)
+            self.limiter.settle(model, reserved, usage.get("total_tokens"))
+            yield _finish_response(model, cache_text, text.strip()), True
+            return
+        yield f"❌ No model with remaining quota could answer{f': {last_error}' if last_error else ''}", True
+
+
+label_template = (
+    "A table scraped from a web page has these columns, shown with sample rows:\n\n{table}\n\n"
+    "The user asked: {parse_description}\n\n"
+    "Reply with JSON only: a list of objects like {{\"column\": 2, \"name\": \"Price\"}} giving, in the order "
+    "the user wants them, the number of each column they asked for and the label to use for it. "
+    "If the table has no column for something the user asked for, reply with []."
+)
+
+
+def label_columns(headers: list, sample_rows: list, parse_description: str, model_name: str):
+    """
+    Ask the model only which table columns the description wants and how to
+    label them. Returns [(column index, name)] or None if the answer is unusable.
+    """
+    lines = [" | ".join(f"{i}: {h}" for i, h in enumerate(headers, start=1))]
+    lines.extend(" | ".join(cell[:80] for cell in row) for row in sample_rows)
+    prompt = ChatPromptTemplate.from_template(label_template).format(
+        table="\n".join(lines)[:2000],
+        parse_description=parse_description,
+    )
+    result = call_groq_model(prompt, model_name, validate=False)
+    match = re.search(r"\[.*\]", result, re.S)
+    if result.startswith("❌") or not match:
+        return None
+    try:
+        picked = json.loads(match.group(0))
+        columns = [(int(item["column"]) - 1, str(item["name"])) for item in picked]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if not columns or any(not 0 <= index < len(headers) for index, _ in columns):
+        return None
+    return columns
+
+
 def is_garbled_response(text: str) -> bool:
     """
     Check if the AI response is garbled/encoded
@@ -115,19 +760,166 @@ def is_garbled_response(text: str) -> bool:
     return False
 
 
-def parse_with_external_ai(dom_chunks, parse_description, model_name: str):
+def _plan_requests(numbered_chunks: list, parse_description, model_name: str, pack: bool, router=None) -> list:
+    """(chunk numbers, prompt) for every request needed to parse the (number, chunk) pairs"""
+    # Chunks are sized by chunk_token_budget, so the prompt must not cut them shorter
+    token_budget = router.chunk_token_budget() if router else chunk_token_budget(model_name)
+    max_length = chars_for_tokens(token_budget)
+    if pack:
+        packs = _pack_numbered(numbered_chunks, token_budget)
+    else:
+        packs = [[numbered] for numbered in numbered_chunks]
+
+    planned = []
+    for numbered_chunks in packs:
+        numbers = [number for number, _ in numbered_chunks]
+        if len(numbered_chunks) == 1:
+            prompt = build_prompt(numbered_chunks[0][1], parse_description, max_length)
+        else:
+            prompt = build_packed_prompt(numbered_chunks, parse_description, max_length)
+        planned.append((numbers, prompt))
+    return planned
+
+
+def _log_request(numbers: list, total: int):
+    if len(numbers) == 1:
+        print(f"Processing batch {numbers[0]} of {total}")
+    else:
+        print(f"Processing batches {numbers[0]}-{numbers[-1]} of {total} in one request")
+
+
+def _results_per_chunk(numbers: list, result: str) -> list:
+    """Map one request's answer back onto the chunks it covered"""
+    if len(numbers) == 1:
+        return [result]
+    if result.startswith("❌"):
+        return [result] * len(numbers)
+    sections = split_packed_result(result, numbers)
+    return [sections.get(number, "") for number in numbers]
+
+
+def _storable(numbers: list, result: str, results: list) -> list:
     """
-    Uses Groq-hosted model to parse each DOM chunk.
-    Returns combined text of all parsed chunks.
+    Which per-chunk results may be saved for reuse. A packed answer's empty
+    sections may just be the model ignoring the format, and an unlabelled
+    answer can't be traced to its chunks, so neither is kept.
     """
-    parsed_result = []
+    if len(numbers) == 1:
+        return [True]
+    labelled = bool(_section_labels(result, numbers))
+    return [labelled and bool(r) for r in results]
 
-    for i, chunk in enumerate(dom_chunks, start=1):
-        print(f"Processing batch {i} of {len(dom_chunks)}")
-        
-        prompt = build_prompt(chunk, parse_description)
-        result = call_groq_model(prompt, model_name)
-        
+
+def _model_key(model_name: str, router=None) -> str:
+    """Stored results are only reused by the same model (or the same router models)"""
+    return ",".join(router.models) if router else model_name
+
+
+def _reusable(dom_chunks: list, parse_description, reuse: bool, model_key: str):
+    """Stored results by chunk number, and the (number, chunk) pairs still to parse"""
+    known = {}
+    if reuse:
+        found = fingerprints.lookup_results(dom_chunks, parse_description, model_key)
+        known = {i + 1: result for i, result in found.items()}
+        if known:
+            print(f"♻️ Reusing results for {len(known)} of {len(dom_chunks)} unchanged chunks")
+    return known, [(n, chunk) for n, chunk in enumerate(dom_chunks, start=1) if n not in known]
+
+
+def parse_chunk_results(
+    dom_chunks, parse_description, model_name: str, concurrency: int = 4, pack: bool = False, router=None,
+    reuse: bool = False
+) -> list:
+    """
+    Parse every chunk and return one result per chunk, in chunk order.
+    With pack=True, consecutive chunks share a request up to the model's
+    token budget and the labelled answer is split back per chunk; chunks
+    the model found nothing in get "" and failed requests "❌ ...".
+    With a ModelRouter, requests go through it instead of model_name.
+    With reuse=True, chunks whose fingerprint was parsed before for this
+    description by the same model (or router models) take the stored
+    result and only the rest are sent.
+    """
+    dom_chunks = list(dom_chunks)
+    model_key = _model_key(model_name, router)
+    known, pending = _reusable(dom_chunks, parse_description, reuse, model_key)
+    planned = _plan_requests(pending, parse_description, model_name, pack, router)
+
+    def run(request):
+        numbers, prompt = request
+        _log_request(numbers, len(dom_chunks))
+        result = router.call(prompt) if router else call_groq_model(prompt, model_name)
+        results = _results_per_chunk(numbers, result)
+        return list(zip(results, _storable(numbers, result, results)))
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        # map() yields results in submission order, whatever order they finish in
+        answered = [item for items in executor.map(run, planned) for item in items]
+    fresh = [result for result, _ in answered]
+
+    if reuse:
+        kept = [(chunk, result) for (_, chunk), (result, storable) in zip(pending, answered) if storable]
+        fingerprints.store_results(
+            [chunk for chunk, _ in kept], [result for _, result in kept], parse_description, model_key
+        )
+    known.update((number, result) for (number, _), result in zip(pending, fresh))
+    return [known[number] for number in range(1, len(dom_chunks) + 1)]
+
+
+def stream_chunk_results(
+    dom_chunks, parse_description, model_name: str, concurrency: int = 4, pack: bool = False, router=None,
+    reuse: bool = False
+):
+    """
+    Streaming counterpart of parse_chunk_results. Yields
+    (chunk_number, text, done) as answers are generated, in arrival order;
+    text is the chunk's answer so far and replaces any earlier text for
+    that chunk. Every chunk ends with exactly one done=True event. While
+    a packed request streams, its raw labelled text is reported under its
+    first chunk number and split per chunk when it completes. With
+    reuse=True, stored results for unchanged chunks are yielded first.
+    """
+    dom_chunks = list(dom_chunks)
+    model_key = _model_key(model_name, router)
+    known, pending = _reusable(dom_chunks, parse_description, reuse, model_key)
+    for number, result in known.items():
+        yield number, result, True
+    planned = _plan_requests(pending, parse_description, model_name, pack, router)
+    events = queue.Queue()
+
+    def run(request):
+        numbers, prompt = request
+        _log_request(numbers, len(dom_chunks))
+        try:
+            stream = router.stream(prompt) if router else stream_groq_model(prompt, model_name)
+            for text, done in stream:
+                if done:
+                    results = _results_per_chunk(numbers, text)
+                    for number, result, storable in zip(numbers, results, _storable(numbers, text, results)):
+                        events.put((number, result, True, storable))
+                    return
+                events.put((numbers[0], text, False, False))
+        except Exception as e:
+            for number in numbers:
+                events.put((number, f"❌ Error calling AI model: {str(e)}", True, False))
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for request in planned:
+            executor.submit(run, request)
+        remaining = len(pending)
+        while remaining:
+            number, text, done, storable = events.get()
+            if done:
+                remaining -= 1
+                if reuse and storable:
+                    fingerprints.store_results([dom_chunks[number - 1]], [text], parse_description, model_key)
+            yield number, text, done
+
+
+def join_chunk_results(results) -> str:
+    """Combine per-chunk results in order, skipping empty and failed ones"""
+    parsed_result = []
+    for i, result in enumerate(results, start=1):
         # Skip empty or error results
         if result and not result.startswith("❌"):
             parsed_result.append(result)
@@ -138,3 +930,19 @@ def parse_with_external_ai(dom_chunks, parse_description, model_name: str):
         return "❌ No relevant information could be extracted from the website content. The site may not contain information about Solution Engineer positions, or the content format may not be compatible."
     
     return "\n\n".join(parsed_result)
+
+
+def parse_with_external_ai(
+    dom_chunks, parse_description, model_name: str, concurrency: int = 4, pack: bool = False, router=None,
+    reuse: bool = False
+):
+    """
+    Uses Groq-hosted model to parse each DOM chunk.
+    Up to `concurrency` requests are in flight at once; with pack=True
+    small chunks share requests, a ModelRouter spreads them across
+    models, and reuse=True skips chunks parsed before.
+    Returns combined text of all parsed chunks.
+    """
+    return join_chunk_results(
+        parse_chunk_results(dom_chunks, parse_description, model_name, concurrency, pack, router, reuse)
+    )
@@ -0,0 +1,115 @@
+import queue
+import threading
+
+from parse import build_prompt, call_groq_model, chunk_token_budget, join_chunk_results
+from scrape import iter_chunks, stream_page_text
+from tokens import chars_for_tokens
+
+# Bounded hand-offs between stages keep memory flat on huge pages
+LINE_QUEUE_SIZE = 1024
+CHUNK_QUEUE_SIZE = 4
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q: queue.Queue, stop: threading.Event):
+    """Yield items until the producer signals it is done"""
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            # Leave the marker for other consumers of the same queue
+            q.put(item)
+            return
+        yield item
+
+
+def _feed(items, q: queue.Queue, stop: threading.Event, errors: list):
+    """Run one stage in its own thread, pushing its output downstream"""
+    try:
+        for item in items:
+            if not _put(q, item, stop):
+                return
+    except Exception as e:
+        errors.append(e)
+    finally:
+        _put(q, _DONE, stop)
+
+
+def pipeline_parse_stream(url: str, parse_description: str, model_name: str, router=None,
+                          concurrency: int = 4, max_bytes: int = None):
+    """
+    Fetch, clean, chunk and parse one URL with the stages overlapping:
+    cleaned lines flow from stream_page_text to an incremental chunker and
+    each finished chunk goes to the model while the page is still being
+    downloaded. Yields (chunk_number, result) as answers arrive; raises the
+    first stage error (e.g. ScrapeError) after the chunks already parsed.
+
+    Whole-document steps (boilerplate dedup, relevance filtering, packing)
+    need the full text and are not applied here.
+    """
+    token_budget = router.chunk_token_budget() if router else chunk_token_budget(model_name)
+    max_length = chars_for_tokens(token_budget)
+    stop = threading.Event()
+    errors = []
+    lines = queue.Queue(LINE_QUEUE_SIZE)
+    chunks = queue.Queue(CHUNK_QUEUE_SIZE)
+    results = queue.Queue()
+
+    def parse_chunks():
+        try:
+            for number, chunk in _drain(chunks, stop):
+                print(f"Processing batch {number} as it arrives")
+                prompt = build_prompt(chunk, parse_description, max_length)
+                result = router.call(prompt) if router else call_groq_model(prompt, model_name)
+                results.put((number, result))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            results.put(_DONE)
+
+    workers = max(concurrency, 1)
+    threads = [
+        threading.Thread(target=_feed, args=(stream_page_text(url, max_bytes), lines, stop, errors), daemon=True),
+        threading.Thread(
+            target=_feed,
+            args=(enumerate(iter_chunks(_drain(lines, stop), max_tokens=token_budget), start=1), chunks, stop, errors),
+            daemon=True,
+        ),
+    ] + [threading.Thread(target=parse_chunks, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # Unblocks every stage if the caller stops early
+        stop.set()
+
+
+def pipeline_parse(url: str, parse_description: str, model_name: str, router=None,
+                   concurrency: int = 4, max_bytes: int = None) -> str:
+    """pipeline_parse_stream collected into the same text parse_with_external_ai returns"""
+    answers = dict(pipeline_parse_stream(url, parse_description, model_name, router, concurrency, max_bytes))
+    return join_chunk_results([answers[number] for number in sorted(answers)])
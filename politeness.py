@@ -0,0 +1,125 @@
+import email.utils
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Defaults for every host; robots.txt Crawl-delay can raise a host's delay
+MIN_DELAY = float(os.environ.get("POLITE_MIN_DELAY", 1.0))        # Seconds between request starts per host
+MAX_PER_HOST = int(os.environ.get("POLITE_MAX_PER_HOST", 2))      # Requests in flight per host
+MAX_BACKOFF = 60.0              # Longest a host is paused after 429/503, even if Retry-After asks for more
+BACKOFF_FACTOR = 2.0            # Delay growth per throttled response without Retry-After
+RECOVERY_FACTOR = 0.75          # Delay shrink per successful response, down to the host's minimum
+THROTTLE_STATUSES = {429, 503}
+_CANCEL_POLL = 0.1              # Seconds between cancel checks while waiting for a slot
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def retry_after_seconds(headers, default: float):
+    """Seconds from a Retry-After header (delta seconds or HTTP date)"""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, IndexError):
+        return default
+
+
+class HostScheduler:
+    """
+    Per-host politeness: at most max_per_host requests in flight and at
+    least the host's delay between request starts. Requests to different
+    hosts never wait for each other. 429/503 answers pause the host for
+    Retry-After (or a growing backoff); successes relax it again.
+    """
+
+    def __init__(self, min_delay: float = MIN_DELAY, max_per_host: int = MAX_PER_HOST):
+        self.min_delay = min_delay
+        self.max_per_host = max_per_host
+        self._cond = threading.Condition()
+        self._hosts = {}
+
+    def _host(self, host: str) -> dict:
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "active": 0, "next_at": 0.0, "min_delay": self.min_delay,
+                "delay": self.min_delay, "requests": 0, "throttled": 0, "waited": 0.0,
+            }
+        return self._hosts[host]
+
+    def set_min_delay(self, url: str, delay: float):
+        """Raise (or lower) a host's minimum delay, e.g. from robots.txt Crawl-delay"""
+        with self._cond:
+            state = self._host(host_of(url))
+            state["min_delay"] = max(delay, 0.0)
+            state["delay"] = max(state["delay"], state["min_delay"])
+
+    def acquire(self, url: str, cancel: threading.Event = None) -> bool:
+        """
+        Block until this host may receive another request, then claim a slot.
+        Returns False without claiming one if cancel is set while waiting.
+        """
+        host = host_of(url)
+        started = time.monotonic()
+        with self._cond:
+            state = self._host(host)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return False
+                now = time.monotonic()
+                if state["active"] < self.max_per_host and now >= state["next_at"]:
+                    break
+                timeout = None if state["active"] >= self.max_per_host else state["next_at"] - now
+                if cancel is not None:
+                    timeout = _CANCEL_POLL if timeout is None else min(timeout, _CANCEL_POLL)
+                self._cond.wait(timeout)
+            state["active"] += 1
+            state["requests"] += 1
+            state["next_at"] = now + state["delay"]
+            state["waited"] += now - started
+        if now - started >= 0.5:
+            print(f"⏳ Waited {now - started:.1f}s to be polite to {host}")
+        return True
+
+    def release(self, url: str):
+        with self._cond:
+            self._host(host_of(url))["active"] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url: str):
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    def record_response(self, url: str, status_code: int, headers=None):
+        """Back off a host that throttles us, relax it when it answers normally"""
+        with self._cond:
+            state = self._host(host_of(url))
+            if status_code in THROTTLE_STATUSES:
+                state["throttled"] += 1
+                state["delay"] = min(max(state["delay"], 1.0) * BACKOFF_FACTOR, MAX_BACKOFF)
+                pause = min(retry_after_seconds(headers, state["delay"]), MAX_BACKOFF)
+                state["next_at"] = max(state["next_at"], time.monotonic() + pause)
+                print(f"🐢 {host_of(url)} answered {status_code}, pausing {pause:.1f}s")
+            else:
+                state["delay"] = max(state["delay"] * RECOVERY_FACTOR, state["min_delay"])
+            self._cond.notify_all()
+
+    def get_host_stats(self) -> dict:
+        with self._cond:
+            return {host: dict(state) for host, state in self._hosts.items()}
+
+
+scheduler = HostScheduler()
@@ -0,0 +1,94 @@
+import math
+import re
+from collections import Counter
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Instruction words that say how to format the answer, not what to look for
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is",
+    "it", "of", "on", "or", "the", "this", "to", "with", "all", "any", "each", "every",
+    "extract", "find", "list", "get", "give", "show", "return", "include", "including",
+    "please", "me", "their", "them", "its", "page", "website", "site", "markdown",
+    "table", "column", "columns", "format", "json", "csv", "e", "g",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    """Fold simple English plurals so 'prices' matches 'price'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    return [_stem(word) for word in _WORD.findall(text.lower())]
+
+
+def query_terms(description: str) -> list:
+    """Distinct content words of a parse description"""
+    words = _WORD.findall(description.lower())
+    return list(dict.fromkeys(_stem(w) for w in words if w not in STOPWORDS and _stem(w) not in STOPWORDS))
+
+
+def score_chunks(chunks: list, description: str) -> list:
+    """BM25 score of every chunk against the description, in chunk order"""
+    terms = query_terms(description)
+    if not chunks or not terms:
+        return [0.0] * len(chunks)
+
+    counts = [Counter(tokenize(chunk)) for chunk in chunks]
+    lengths = [sum(c.values()) for c in counts]
+    average_length = (sum(lengths) / len(lengths)) or 1.0
+    total = len(chunks)
+
+    idf = {}
+    for term in terms:
+        df = sum(1 for c in counts if term in c)
+        idf[term] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    scores = []
+    for c, length in zip(counts, lengths):
+        norm = K1 * (1 - B + B * length / average_length)
+        score = 0.0
+        for term in terms:
+            tf = c.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+def select_relevant_chunks(chunks: list, description: str, top_k: int = None, min_ratio: float = 0.1,
+                           before: int = 1, after: int = 2) -> list:
+    """
+    Keep the chunks worth sending to the model, in their original order.
+    A chunk is kept if it scores at least min_ratio of the best score and is
+    among the top_k best (when top_k is given). The `before` chunks ahead of
+    a kept chunk and the `after` chunks following it are kept too, since
+    data often follows the text that names it ("prices are listed below")
+    without repeating its words. When nothing matches the description at
+    all, every chunk is kept rather than guessing.
+    """
+    scores = score_chunks(chunks, description)
+    best = max(scores, default=0.0)
+    if best <= 0:
+        return list(chunks)
+
+    ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+    matched = {i for i in ranked[:top_k] if scores[i] >= best * min_ratio}
+    keep = {j for i in matched for j in range(i - before, i + after + 1) if 0 <= j < len(chunks)}
+
+    selected = []
+    for i, chunk in enumerate(chunks):
+        if i in keep:
+            selected.append(chunk)
+        else:
+            print(f"⏭️ Skipping chunk {i + 1} of {len(chunks)} (relevance {scores[i]:.2f} of best {best:.2f})")
+    return selected
@@ -0,0 +1,262 @@
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from lxml import etree
+
+from politeness import scheduler
+from scrape import STREAM_CHUNK_SIZE, cached_get, get_session
+
+# Product token matched against robots.txt User-agent lines
+USER_AGENT = os.environ.get("ROBOTS_USER_AGENT", "AI-Web-Crawler")
+ROBOTS_TTL = int(os.environ.get("ROBOTS_TTL", 24 * 3600))
+ROBOTS_ERROR_TTL = 600          # Retry sooner after a 5xx or network failure
+ROBOTS_MAX_BYTES = 500 * 1024   # RFC 9309 minimum parsers must handle
+MAX_CRAWL_DELAY = 60.0
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024    # Protocol limit for one uncompressed sitemap
+MAX_SITEMAP_DEPTH = 3           # Sitemap index nesting followed
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _compile(pattern: str):
+    """Rule path to a matcher: a plain prefix string, or a regex for * and $"""
+    if "*" not in pattern and not pattern.endswith("$"):
+        return pattern
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(part) for part in body.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+
+class RobotsRules:
+    """
+    Compiled robots.txt rules for one user agent. Rules are sorted longest
+    first, so the first match is the most specific one (RFC 9309); Allow
+    wins over Disallow of the same length.
+    """
+
+    def __init__(self, rules=(), crawl_delay: float = None, sitemaps=(), allow_all: bool = False,
+                 disallow_all: bool = False):
+        ordered = sorted(rules, key=lambda rule: (-len(rule[1]), not rule[0]))
+        self.rules = [(allowed, _compile(path)) for allowed, path in ordered if path]
+        self.crawl_delay = crawl_delay
+        self.sitemaps = list(sitemaps)
+        self.allow_all = allow_all
+        self.disallow_all = disallow_all
+
+    def can_fetch(self, url: str) -> bool:
+        if self.allow_all:
+            return True
+        if self.disallow_all:
+            return False
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        for allowed, matcher in self.rules:
+            if matcher.match(path) if isinstance(matcher, re.Pattern) else path.startswith(matcher):
+                return allowed
+        return True
+
+
+def _product_token(value: str) -> str:
+    """'AI-Web-Crawler/1.0 (+url)' -> 'ai-web-crawler'"""
+    return value.split("/", 1)[0].strip().split(" ", 1)[0].lower()
+
+
+def parse_robots(text: str, user_agent: str = USER_AGENT) -> RobotsRules:
+    """Rules of the group naming user_agent's product token, else the '*' group"""
+    product = _product_token(user_agent)
+    groups = {}         # agent token -> {"rules": [...], "delay": ...}
+    sitemaps = []
+    current, in_rules = [], False
+
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+        if field == "sitemap":
+            sitemaps.append(value)
+        elif field == "user-agent":
+            if in_rules:
+                # A user-agent line after rules starts a new group
+                current, in_rules = [], False
+            token = _product_token(value)
+            current.append(token)
+            groups.setdefault(token, {"rules": [], "delay": None})
+        elif field in ("allow", "disallow") and current:
+            in_rules = True
+            for token in current:
+                groups[token]["rules"].append((field == "allow", value))
+        elif field == "crawl-delay" and current:
+            in_rules = True
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            for token in current:
+                groups[token]["delay"] = delay
+
+    # RFC 9309: our product token, compared case-insensitively, else '*'
+    group = groups.get(product) or groups.get("*")
+    if group is None:
+        return RobotsRules(sitemaps=sitemaps)
+    return RobotsRules(group["rules"], group["delay"], sitemaps)
+
+
+def _fetch_rules(origin: str):
+    """(rules, ttl) for a scheme://host origin"""
+    try:
+        response = cached_get(
+            origin + "/robots.txt", headers={"User-Agent": USER_AGENT}, timeout=10, max_bytes=ROBOTS_MAX_BYTES
+        )
+    except requests.exceptions.RequestException as e:
+        # RFC 9309: an unreachable robots.txt is treated as a complete disallow
+        print(f"⚠️ Could not fetch robots.txt for {origin}: {e}")
+        return RobotsRules(disallow_all=True), ROBOTS_ERROR_TTL
+    if response.status_code >= 500:
+        # Server trouble means "don't crawl" until it recovers
+        return RobotsRules(disallow_all=True), ROBOTS_ERROR_TTL
+    if response.status_code >= 400:
+        return RobotsRules(allow_all=True), ROBOTS_TTL
+    return parse_robots(response.text), ROBOTS_TTL
+
+
+def get_rules(url: str) -> RobotsRules:
+    """Cached robots.txt rules for a URL's host; applies its Crawl-delay to the scheduler"""
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}".lower()
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(origin)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    rules, ttl = _fetch_rules(origin)
+    if rules.crawl_delay:
+        # Crawl-delay can slow a host down, never below our own default
+        scheduler.set_min_delay(url, min(max(rules.crawl_delay, scheduler.min_delay), MAX_CRAWL_DELAY))
+    with _lock:
+        _cache[origin] = (rules, now + ttl)
+    return rules
+
+
+def can_fetch(url: str) -> bool:
+    return get_rules(url).can_fetch(url)
+
+
+def sitemap_urls(url: str) -> list:
+    """Sitemaps listed in robots.txt, or the conventional /sitemap.xml"""
+    rules = get_rules(url)
+    return rules.sitemaps or [urljoin(url, "/sitemap.xml")]
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def parse_lastmod(value: str):
+    """W3C datetime (YYYY, YYYY-MM-DD or full timestamp) as an aware datetime, or None"""
+    if not value:
+        return None
+    value = value.strip().replace("Z", "+00:00")
+    for candidate in (value, value[:10]):
+        try:
+            parsed = datetime.fromisoformat(candidate)
+        except ValueError:
+            continue
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def _spool_sitemap(url: str):
+    """
+    Download one sitemap to a temporary file, gunzipping .xml.gz as it
+    streams, so the connection is done before any entry is handed out.
+    Returns the file rewound to the start, or None if the server refused.
+    """
+    with scheduler.slot(url):
+        response = get_session().get(url, timeout=20, stream=True)
+    scheduler.record_response(url, response.status_code, response.headers)
+    with response:
+        if response.status_code >= 400:
+            print(f"⚠️ Sitemap {url} returned {response.status_code}")
+            return None
+
+        spool = tempfile.TemporaryFile()
+        try:
+            inflate = None
+            size = 0
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                if inflate is None:
+                    # .xml.gz files arrive as gzip bytes (requests only undoes Content-Encoding)
+                    gzipped = chunk[:2] == b"\x1f\x8b"
+                    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else False
+                data = inflate.decompress(chunk, SITEMAP_MAX_BYTES - size) if inflate else chunk
+                data = data[:SITEMAP_MAX_BYTES - size]
+                size += len(data)
+                spool.write(data)
+                if size >= SITEMAP_MAX_BYTES:
+                    print(f"✂️ Stopped reading sitemap at {SITEMAP_MAX_BYTES:,} bytes: {url}")
+                    break
+        except BaseException:
+            spool.close()
+            raise
+    spool.seek(0)
+    return spool
+
+
+def _sitemap_entries(url: str):
+    """Parse one sitemap lazily from its spooled copy: yields ("url" | "sitemap", loc, lastmod) per entry"""
+    spool = _spool_sitemap(url)
+    if spool is None:
+        return
+    with spool:
+        parser = etree.XMLPullParser(events=("end",), resolve_entities=False, huge_tree=True)
+        for data in iter(lambda: spool.read(STREAM_CHUNK_SIZE), b""):
+            parser.feed(data)
+            for _, element in parser.read_events():
+                name = _local(element.tag)
+                if name not in ("url", "sitemap"):
+                    continue
+                fields = {_local(child.tag): (child.text or "").strip() for child in element}
+                if fields.get("loc"):
+                    yield name, fields["loc"], parse_lastmod(fields.get("lastmod"))
+                # Drop finished entries so memory stays flat on huge sitemaps
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+
+def iter_sitemap(url: str, modified_since: datetime = None, _depth: int = 0, _seen: set = None):
+    """
+    Yield (page_url, lastmod) from a sitemap or sitemap index, gzipped or
+    plain XML. Each file is downloaded in full before its entries are read.
+    With modified_since, entries whose lastmod is older are skipped without
+    being fetched; entries without lastmod are kept.
+    """
+    seen = _seen if _seen is not None else set()
+    if modified_since and modified_since.tzinfo is None:
+        modified_since = modified_since.replace(tzinfo=timezone.utc)
+    if url in seen or _depth > MAX_SITEMAP_DEPTH:
+        return
+    seen.add(url)
+
+    try:
+        for kind, loc, lastmod in _sitemap_entries(url):
+            if modified_since and lastmod and lastmod < modified_since:
+                continue
+            if kind == "sitemap":
+                yield from iter_sitemap(loc, modified_since, _depth + 1, seen)
+            else:
+                yield loc, lastmod
+    except (requests.exceptions.RequestException, etree.XMLSyntaxError, zlib.error) as e:
+        print(f"⚠️ Could not read sitemap {url}: {e}")
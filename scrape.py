@@ -1,12 +1,381 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError
 from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+import lxml.html
+from lxml import etree
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+import asyncio
+import codecs
+import copy
+import hashlib
+from html import escape as html_escape
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+import ipaddress
+import socket
+import threading
 import time
 import random
 import re
 
-def scrape_website(website: str) -> str:
+import http_cache
+from tokens import chars_for_tokens
+from domain_stats import rank_strategies, record_attempt, save_stats
+from politeness import scheduler
+
+# ======================
+# Shared HTTP transport
+# ======================
+
+POOL_MAX_HOSTS = 100        # Number of per-host pools kept alive
+POOL_MAX_PER_HOST = 10      # Keep-alive connections kept per host
+DNS_CACHE_TTL = 300         # Seconds a resolved address is reused
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024   # Bodies are cut off past this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_pool_stats = {"requests": 0, "new_connections": 0, "dns_hits": 0, "dns_misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, amount: int = 1):
+    with _stats_lock:
+        _pool_stats[key] += amount
+
+
+def _resolve_cached(host: str, port: int) -> list:
+    """Resolve host to its addresses, reusing recent lookups"""
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return [host]
+    except ValueError:
+        pass
+
+    now = time.monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(host)
+        if cached and cached[1] > now:
+            _count("dns_hits")
+            return cached[0]
+
+    _count("dns_misses")
+    infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    with _dns_lock:
+        _dns_cache[host] = (addresses, now + DNS_CACHE_TTL)
+    return addresses
+
+
+def _prefer_address(host: str, address: str):
+    """Try an address that just connected first next time"""
+    with _dns_lock:
+        cached = _dns_cache.get(host)
+        if cached and cached[0][0] != address and address in cached[0]:
+            addresses = [address] + [a for a in cached[0] if a != address]
+            _dns_cache[host] = (addresses, cached[1])
+
+
+def _forget_address(host: str):
+    with _dns_lock:
+        _dns_cache.pop(host, None)
+
+
+class _CachedDNSMixin:
+    """Opens sockets through the DNS cache and counts fresh handshakes"""
+
+    def _new_conn(self):
+        _count("new_connections")
+        hostname = self._dns_host
+        try:
+            addresses = _resolve_cached(hostname, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(hostname, self, e) from e
+        
+        error = None
+        try:
+            # Like urllib3 itself, fall through to the next address when one refuses
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                except ConnectTimeoutError as e:
+                    error = e
+                    continue
+                _prefer_address(hostname, address)
+                return sock
+            _forget_address(hostname)
+            raise error
+        finally:
+            # TLS (SNI and certificate checks) must still see the real hostname
+            self._dns_host = hostname
+
+
+class _PooledHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class _PooledHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class _PooledHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PooledHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        _count("requests")
+        return super()._get_conn(timeout)
+
+
+class _PooledHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PooledHTTPSConnection
+
+    def _get_conn(self, timeout=None):
+        _count("requests")
+        return super()._get_conn(timeout)
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools reuse connections and cached DNS lookups"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PooledHTTPConnectionPool,
+            "https": _PooledHTTPSConnectionPool,
+        }
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = _PooledAdapter(pool_connections=POOL_MAX_HOSTS, pool_maxsize=POOL_MAX_PER_HOST)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _build_session()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session shared by all strategies"""
+    return _session
+
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+
+def sniff_encoding(headers, head: bytes, default: str = None) -> str:
+    """Encoding from the Content-Type charset, else from a <meta> tag in the first bytes"""
+    match = re.search(r'charset\s*=\s*["\']?([\w.:-]+)', headers.get("Content-Type", ""), re.I)
+    if not match:
+        match = _META_CHARSET.search(head[:4096])
+    if match:
+        name = match.group(1)
+        name = name.decode("ascii", "ignore") if isinstance(name, bytes) else name
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return default
+
+
+class ScrapeCancelled(requests.exceptions.RequestException):
+    """A hedged strategy was stopped because another one already won"""
+
+
+class _Cancellation:
+    """
+    Shared by the strategies of one hedged scrape. cancel() sets the event
+    and runs the registered callbacks, which close in-flight responses and
+    hand back politeness slots still held by the losing strategies.
+    """
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+    
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self.event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+    
+    def cancel(self):
+        with self._lock:
+            self.event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+def _abort(response: requests.Response):
+    """Interrupt a body read blocked in another thread by shutting its socket down"""
+    connection = getattr(response.raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+# The cancellation of the hedged scrape a worker thread is running for, if any
+_hedge = threading.local()
+
+
+def _cancelled() -> bool:
+    cancel = getattr(_hedge, "cancel", None)
+    return cancel is not None and cancel.event.is_set()
+
+
+def _check_cancelled():
+    if _cancelled():
+        raise ScrapeCancelled("Another strategy already answered")
+
+
+@contextmanager
+def _polite_slot(url: str):
+    """scheduler.slot that a hedged scrape's cancel() releases straight away"""
+    cancel = getattr(_hedge, "cancel", None)
+    if cancel is None:
+        with scheduler.slot(url):
+            yield
+        return
+    
+    if not scheduler.acquire(url, cancel.event):
+        _check_cancelled()
+    held = [True]
+    lock = threading.Lock()
+    
+    def release():
+        with lock:
+            if not held[0]:
+                return
+            held[0] = False
+        scheduler.release(url)
+    
+    cancel.on_cancel(release)
+    try:
+        _check_cancelled()
+        yield
+    finally:
+        cancel.discard(release)
+        release()
+
+
+def read_capped(response: requests.Response, max_bytes: int = None) -> requests.Response:
+    """
+    Read a streamed response body in chunks, stopping at max_bytes.
+    The encoding comes from the headers or the page's meta tag, so decoding
+    never runs charset detection over the whole body.
+    In a hedged scrape the read is aborted as soon as another strategy wins.
+    """
+    if getattr(response, "from_cache", False):
+        return response
+    max_bytes = max_bytes or MAX_RESPONSE_BYTES
+    cancel = getattr(_hedge, "cancel", None)
+    abort = lambda: _abort(response)
+    if cancel is not None:
+        cancel.on_cancel(abort)
+    
+    chunks, size = [], 0
+    response.truncated = False
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            _check_cancelled()
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                print(f"✂️ Response truncated at {max_bytes:,} bytes: {response.url}")
+                response.truncated = True
+                response.close()
+                break
+    except Exception:
+        # Aborting the response from another thread breaks the read mid-way
+        response.close()
+        _check_cancelled()
+        raise
+    finally:
+        if cancel is not None:
+            cancel.discard(abort)
+    
+    response._content = b"".join(chunks)[:max_bytes]
+    response._content_consumed = True
+    response.encoding = sniff_encoding(response.headers, response._content, response.encoding or "utf-8")
+    return response
+
+
+def cached_get(url: str, headers: dict = None, max_bytes: int = None, **kwargs) -> requests.Response:
+    """
+    GET through the shared session and the on-disk HTTP cache.
+    Fresh entries are served without a request; stale ones are revalidated
+    with If-None-Match / If-Modified-Since and reused on 304.
+    The body is streamed and capped at max_bytes (MAX_RESPONSE_BYTES by default).
+    """
+    _check_cancelled()
+    entry = http_cache.lookup(url)
+    if entry and http_cache.is_fresh(entry):
+        print(f"💾 Cache hit: {url}")
+        http_cache.touch(url)
+        return http_cache.to_response(url, entry)
+    if entry:
+        headers = {**(headers or {}), **http_cache.conditional_headers(entry)}
+    
+    # Per-host pacing and concurrency cap; cache hits above never wait
+    with _polite_slot(url):
+        response = read_capped(_session.get(url, headers=headers, stream=True, **kwargs), max_bytes)
+    _check_cancelled()
+    scheduler.record_response(url, response.status_code, response.headers)
+    
+    if entry and response.status_code == 304:
+        print(f"💾 Not modified, reusing cached copy: {url}")
+        return http_cache.refresh(url, response, entry)
+    http_cache.record_miss()
+    return response
+
+
+def get_pool_stats() -> dict:
+    """
+    Connection reuse counters for the shared session.
+    A hit is a request served over an already-open keep-alive connection.
+    """
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats["connection_hits"] = max(stats["requests"] - stats["new_connections"], 0)
+    stats["connection_misses"] = stats["new_connections"]
+    return stats
+
+
+def scrape_website(website: str, hedge_delay: float = None) -> str:
     """
-    Enhanced scraping with better anti-block measures
+    Enhanced scraping with better anti-block measures.
+    With hedge_delay set, strategies are raced instead of run one by one:
+    the next strategy starts after hedge_delay seconds (0 starts all at once)
+    and the first valid response wins; POLITE_MAX_PER_HOST caps how many
+    of them are in flight at the same time.
+    """
+    return scrape_website_with_reason(website, hedge_delay)[0]
+
+def scrape_website_with_reason(website: str, hedge_delay: float = None) -> tuple:
+    """
+    Same as scrape_website but returns (html_content, reason), where reason is
+    the classify_response code of the accepted page. Failures raise ScrapeError.
     """
     print(f"🔍 Scraping: {website}")
     
@@ -14,93 +383,251 @@ def scrape_website(website: str) -> str:
     if not website.startswith(('http://', 'https://')):
         website = 'https://' + website
     
-    strategies = [
-        try_scrape_stealth,
-        try_scrape_with_retry,
-        try_scrape_simple,
-        try_scrape_minimal
-    ]
+    if hedge_delay is not None:
+        return scrape_website_hedged(website, hedge_delay)
+    
+    strategies = rank_strategies(website, SCRAPE_STRATEGIES)
+    reason, status_code = REASON_NO_RESPONSE, None
     
-    for i, strategy in enumerate(strategies, 1):
-        print(f"🔄 Trying strategy {i}/{len(strategies)}...")
-        html_content = strategy(website)
+    try:
+        for i, strategy in enumerate(strategies, 1):
+            print(f"🔄 Trying strategy {i}/{len(strategies)} ({strategy.__name__})...")
+            html_content, reason, status_code = _run_strategy(strategy, website)
+            
+            if html_content:
+                print(f"✅ Success with strategy {i}")
+                return html_content, reason
+            if reason in FINAL_REASONS:
+                break  # Another strategy would download the same answer
         
-        if html_content and is_valid_content(html_content):
-            print(f"✅ Success with strategy {i}")
-            return html_content
+        return _fail(website, reason, status_code)
+    finally:
+        save_stats()
+
+def _run_strategy(strategy, website: str) -> tuple:
+    """
+    Run one strategy, classify the response and record the outcome for its domain.
+    Page-level answers (not found, not HTML, empty) are not held against the strategy.
+    Returns (html_content, reason, status_code); html_content is None unless accepted.
+    """
+    started = time.monotonic()
+    response = strategy(website)
+    latency = time.monotonic() - started
+    
+    if _cancelled():
+        # Lost a hedged race: its outcome says nothing about the strategy
+        return None, REASON_NO_RESPONSE, None
+    if response is None:
+        record_attempt(website, strategy.__name__, False, latency, REASON_NO_RESPONSE)
+        return None, REASON_NO_RESPONSE, None
+    
+    html_content = response.text
+    reason = classify_response(html_content, response.status_code, response.headers)
+    if reason not in ACCEPTED_REASONS:
+        print(f"🚫 {strategy.__name__}: {reason} ({response.status_code})")
+        if reason in STRATEGY_FAILURE_REASONS:
+            record_attempt(website, strategy.__name__, False, latency, reason)
+        return None, reason, response.status_code
+    
+    record_attempt(website, strategy.__name__, True, latency)
+    http_cache.store(website, response)
+    return html_content, reason, response.status_code
+
+def _fail(website: str, reason: str, status_code: int = None):
+    """Raise the error for the last failed strategy without downloading the page again"""
+    if reason == REASON_NO_RESPONSE:
+        # Nothing came back at all; one cheap request tells us why
+        return try_final_attempt(website)
+    raise scrape_error_for(reason, status_code)
+
+def _run_hedged(strategy, website: str, cancel: _Cancellation) -> tuple:
+    """_run_strategy on a hedge worker thread, stoppable through cancel"""
+    _hedge.cancel = cancel
+    try:
+        return _run_strategy(strategy, website)
+    finally:
+        _hedge.cancel = None
+
+def scrape_website_hedged(website: str, hedge_delay: float = 2.0) -> tuple:
+    """
+    Race the strategies, launching one every hedge_delay seconds.
+    Returns (html_content, reason) like scrape_website_with_reason.
+    Once one strategy answers, the others are cancelled: their responses
+    are closed and their politeness slots handed back. The strategies still
+    share the host's POLITE_MAX_PER_HOST slots, so at most that many race
+    at once; the rest wait for a slot.
+    """
+    strategies = rank_strategies(website, SCRAPE_STRATEGIES)
+    reason, status_code = REASON_NO_RESPONSE, None
+    cancel = _Cancellation()
+    executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="hedge")
+    pending = {}
+    next_index = 0
+    next_launch = time.monotonic()
+    
+    try:
+        while next_index < len(strategies) or pending:
+            # Launch every strategy whose hedge time has come
+            while next_index < len(strategies) and time.monotonic() >= next_launch:
+                strategy = strategies[next_index]
+                print(f"🔄 Launching strategy {next_index + 1}/{len(strategies)} ({strategy.__name__})...")
+                future = executor.submit(_run_hedged, strategy, website, cancel)
+                pending[future] = next_index + 1
+                next_index += 1
+                next_launch = time.monotonic() + hedge_delay
+            
+            timeout = None
+            if next_index < len(strategies):
+                timeout = max(next_launch - time.monotonic(), 0)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                i = pending.pop(future)
+                html_content, reason, status_code = future.result()
+                if html_content:
+                    print(f"✅ Success with strategy {i}")
+                    return html_content, reason
+                if reason in FINAL_REASONS:
+                    return _fail(website, reason, status_code)
+                # A definite failure frees the slot for the next strategy now
+                next_launch = time.monotonic()
+    finally:
+        # Stop the strategies still in flight; their threads exit in the background
+        cancel.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        save_stats()
+    
+    return _fail(website, reason, status_code)
+
+async def scrape_website_async(website: str, executor=None) -> str:
+    """
+    Async counterpart of scrape_website with the same strategy fallbacks.
+    Blocking fetches run on worker threads so the event loop stays free.
+    """
+    print(f"🔍 Scraping: {website}")
+    loop = asyncio.get_running_loop()
+    
+    if not website.startswith(('http://', 'https://')):
+        website = 'https://' + website
+    
+    strategies = rank_strategies(website, SCRAPE_STRATEGIES)
+    reason, status_code = REASON_NO_RESPONSE, None
+    
+    try:
+        for i, strategy in enumerate(strategies, 1):
+            print(f"🔄 Trying strategy {i}/{len(strategies)} ({strategy.__name__})...")
+            html_content, reason, status_code = await loop.run_in_executor(
+                executor, _run_strategy, strategy, website
+            )
+            
+            if html_content:
+                print(f"✅ Success with strategy {i}")
+                return html_content
+            if reason in FINAL_REASONS:
+                break
         
-        time.sleep(1)  # Brief delay between strategies
+        return await loop.run_in_executor(executor, _fail, website, reason, status_code)
+    finally:
+        await loop.run_in_executor(executor, save_stats)
+
+async def scrape_many(urls, concurrency: int = 50):
+    """
+    Scrape many URLs on one event loop with at most `concurrency` in flight.
+    Yields (url, html_content, error) tuples in the order they finish.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scrape")
     
-    # Final attempt with error details
-    return try_final_attempt(website)
+    async def run(url):
+        async with semaphore:
+            try:
+                return url, await scrape_website_async(url, executor), None
+            except Exception as e:
+                return url, None, e
+    
+    tasks = [asyncio.create_task(run(url)) for url in urls]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0'
+]
+
+def browser_headers() -> dict:
+    """Realistic browser request headers with a random user agent"""
+    return {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0'
+    }
 
-def try_scrape_stealth(url: str) -> str:
+def try_scrape_stealth(url: str) -> requests.Response:
     """Stealth scraping with realistic browser headers"""
     try:
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0'
-        ]
-        
-        headers = {
-            'User-Agent': random.choice(user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        # Add random delay to mimic human behavior
-        time.sleep(random.uniform(1, 3))
+        headers = browser_headers()
         
-        response = requests.get(
+        response = cached_get(
             url, 
             headers=headers, 
             timeout=20,
             allow_redirects=True
         )
-        response.raise_for_status()
         
-        return response.text
+        return response
             
     except Exception as e:
         print(f"❌ Stealth approach failed: {e}")
         return None
 
-def try_scrape_with_retry(url: str) -> str:
-    """Retry strategy with exponential backoff"""
+def try_scrape_with_retry(url: str) -> requests.Response:
+    """
+    Retry on network errors, 429 and 5xx. The politeness scheduler spaces
+    the attempts and backs off further when the host sends Retry-After.
+    """
     for attempt in range(3):
         try:
             if attempt > 0:
-                delay = 2 ** attempt  # Exponential backoff: 2, 4 seconds
-                print(f"⏳ Retry {attempt + 1}/3 after {delay}s delay...")
-                time.sleep(delay)
+                print(f"⏳ Retry {attempt + 1}/3...")
                 
             headers = {
                 'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
             }
             
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
+            response = cached_get(url, headers=headers, timeout=15)
+            if response.status_code == 429 or response.status_code >= 500:
+                print(f"❌ Retry {attempt + 1} got status {response.status_code}")
+                if attempt == 2:  # Last attempt
+                    return response
+                continue
             
-            return response.text
+            return response
             
+        except ScrapeCancelled:
+            return None
         except requests.exceptions.RequestException as e:
             print(f"❌ Retry {attempt + 1} failed: {e}")
             if attempt == 2:  # Last attempt
                 return None
 
-def try_scrape_simple(url: str) -> str:
+def try_scrape_simple(url: str) -> requests.Response:
     """Simple approach for basic sites"""
     try:
         headers = {
@@ -108,83 +635,645 @@ def try_scrape_simple(url: str) -> str:
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return cached_get(url, headers=headers, timeout=10)
         
     except Exception as e:
         print(f"❌ Simple approach failed: {e}")
         return None
 
-def try_scrape_minimal(url: str) -> str:
+def try_scrape_minimal(url: str) -> requests.Response:
     """Minimal headers approach"""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return cached_get(url, timeout=10)
         
     except Exception as e:
         print(f"❌ Minimal approach failed: {e}")
         return None
 
+# Fallback order used by scrape_website and its async counterpart
+SCRAPE_STRATEGIES = [
+    try_scrape_stealth,
+    try_scrape_with_retry,
+    try_scrape_simple,
+    try_scrape_minimal
+]
+
 def try_final_attempt(url: str) -> str:
     """Final attempt with detailed error information"""
     try:
-        response = requests.get(url, timeout=5)
+        with scheduler.slot(url):
+            response = _session.get(url, timeout=5)
         status_code = response.status_code
+        scheduler.record_response(url, status_code, response.headers)
         
-        if status_code == 403:
-            raise Exception(f"Access Forbidden (403). Website is blocking our requests.")
-        elif status_code == 404:
-            raise Exception(f"Page not found (404). Please check the URL.")
-        elif status_code == 429:
-            raise Exception(f"Too many requests (429). Website rate limiting detected.")
-        elif status_code >= 500:
-            raise Exception(f"Server error ({status_code}). Website may be down.")
+        if status_code in (403, 404, 429) or status_code >= 500:
+            raise scrape_error_for(classify_response(response.text, status_code, response.headers), status_code)
         else:
             response.raise_for_status()
             
     except requests.exceptions.RequestException as e:
         error_msg = str(e)
         if "SSL" in error_msg:
-            raise Exception("SSL certificate error. Try http:// instead of https://")
+            raise ScrapeError("SSL certificate error. Try http:// instead of https://", REASON_NO_RESPONSE)
         elif "Connection" in error_msg:
-            raise Exception("Connection failed. Website may be down or unreachable.")
+            raise ScrapeError("Connection failed. Website may be down or unreachable.", REASON_NO_RESPONSE)
         elif "Timeout" in error_msg:
-            raise Exception("Request timeout. Website is taking too long to respond.")
+            raise ScrapeError("Request timeout. Website is taking too long to respond.", REASON_NO_RESPONSE)
+        else:
+            raise ScrapeError(f"Website unavailable: {error_msg}", REASON_NO_RESPONSE)
+    
+    raise ScrapeError("All scraping methods failed. The website may have strong anti-bot protection.", REASON_BLOCKED)
+
+# ======================
+# Response classification
+# ======================
+
+REASON_OK = "ok"
+REASON_JS_REQUIRED = "js_required"      # Real page that needs JavaScript to show content
+REASON_BLOCKED = "blocked"
+REASON_CHALLENGE = "challenge"          # Cloudflare / CAPTCHA / bot-manager interstitial
+REASON_RATE_LIMITED = "rate_limited"
+REASON_NOT_FOUND = "not_found"
+REASON_SERVER_ERROR = "server_error"
+REASON_EMPTY = "empty"
+REASON_NOT_HTML = "not_html"
+REASON_NO_RESPONSE = "no_response"
+
+# Pages returned to the caller
+ACCEPTED_REASONS = {REASON_OK, REASON_JS_REQUIRED}
+# Signals that the site is refusing us specifically
+BLOCK_REASONS = {REASON_BLOCKED, REASON_CHALLENGE, REASON_RATE_LIMITED}
+# Answers every strategy would get the same way, so stop instead of re-downloading
+FINAL_REASONS = {REASON_NOT_FOUND, REASON_NOT_HTML}
+# Failures that count against a strategy on the domain; the rest are about one page
+STRATEGY_FAILURE_REASONS = BLOCK_REASONS | {REASON_NO_RESPONSE, REASON_SERVER_ERROR}
+
+# Phrases that mean "blocked" in the title of a page with little else on it
+BLOCK_TITLES = [
+    'access denied', 'attention required', 'just a moment', 'security check',
+    'captcha', 'bot detected', 'are you a robot', 'pardon our interruption',
+    'request rejected', 'permission denied', 'blocked', 'forbidden'
+]
+
+# Titles that are a block page on their own ("403 Forbidden", "Attention Required! | Cloudflare")
+BLOCK_TITLE_PATTERN = re.compile(
+    r'(?:(?:error\s*)?\d{3}\s*[-:|]?\s*)?'
+    r'(?:access denied|access forbidden|forbidden|attention required!?|just a moment\.{0,3}|security check|'
+    r'are you a robot\??|bot detected|pardon our interruption\.{0,3}|request rejected|permission denied|'
+    r'(?:you have been )?blocked|captcha)'
+    r'(?:\s*[-:|]\s*.{0,40})?',
+    re.I
+)
+# Block pages carry a short message; a real page with a title like "Blocked Drains" has content
+BLOCK_PAGE_MAX_WORDS = 150
+
+# Markup that bot-manager challenge pages embed
+CHALLENGE_MARKERS = [
+    'cf-browser-verification', '/cdn-cgi/challenge-platform', 'cf_chl_opt',
+    '_incapsula_resource', 'incapsula incident id', 'distil_r_captcha',
+    'px-captcha', 'captcha-delivery.com', 'g-recaptcha', 'h-captcha'
+]
+
+# Challenge pages are small; a marker inside a large document is just a widget
+CHALLENGE_MAX_LENGTH = 20000
+
+JS_REQUIRED_MARKERS = ['enable javascript', 'javascript is required', 'requires javascript']
+
+CONTENT_INDICATORS = ['<body', '<div', '<p', '<span', '<h1', '<h2', '<article', '<main']
+
+
+class MultiPatternMatcher:
+    """
+    Case-insensitive matcher for a fixed list of literal patterns.
+    The document is scanned once, window by window, so only one small
+    lowercased window exists at a time instead of a copy of the whole page.
+    """
+    
+    WINDOW = 64 * 1024
+    
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(p.lower() for p in patterns))
+        self._overlap = max((len(p) for p in self.patterns), default=1) - 1
+        # Used on the rare window whose lowercase form changes length
+        alternation = "|".join(re.escape(p) for p in sorted(self.patterns, key=len, reverse=True))
+        self._regex = re.compile(alternation, re.IGNORECASE)
+    
+    def _window_matches(self, text: str, start: int, stop: int, end: int) -> list:
+        """Matches starting in [start, stop), allowed to run on up to end"""
+        window = text[start:min(stop + self._overlap, end)]
+        lowered = window.lower()
+        found = []
+        if len(lowered) == len(window):
+            for pattern in self.patterns:
+                index = lowered.find(pattern)
+                while index != -1 and start + index < stop:
+                    found.append((start + index, pattern))
+                    index = lowered.find(pattern, index + 1)
         else:
-            raise Exception(f"Website unavailable: {error_msg}")
+            for match in self._regex.finditer(window):
+                if start + match.start() < stop:
+                    found.append((start + match.start(), match.group(0).lower()))
+        found.sort()
+        return found
     
-    raise Exception("All scraping methods failed. The website may have strong anti-bot protection.")
+    def finditer(self, text: str, start: int = 0, end: int = None):
+        """Yield (position, pattern) for every match, in document order"""
+        end = len(text) if end is None else min(end, len(text))
+        for offset in range(start, end, self.WINDOW):
+            yield from self._window_matches(text, offset, min(offset + self.WINDOW, end), end)
+    
+    def find_all(self, text: str, start: int = 0, end: int = None) -> list:
+        """All matches as a list of (position, pattern)"""
+        return list(self.finditer(text, start, end))
+    
+    def search(self, text: str, start: int = 0, end: int = None):
+        """First (position, pattern) match, or None"""
+        return next(self.finditer(text, start, end), None)
+
+
+# Shared by classify_response and anything else that scans pages for these signals
+BLOCK_TITLE_MATCHER = MultiPatternMatcher(BLOCK_TITLES)
+PAGE_SIGNAL_MATCHER = MultiPatternMatcher(CHALLENGE_MARKERS + JS_REQUIRED_MARKERS)
+CONTENT_MATCHER = MultiPatternMatcher(CONTENT_INDICATORS)
+
+_TITLE = re.compile(r'<title[^>]*>(.*?)</title>', re.I | re.S)
+_LEADING_SPACE = re.compile(r'\s*')
+_TAGS_AND_SCRIPTS = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.I | re.S)
+
+
+def _visible_words(html_content: str) -> int:
+    """Rough count of words outside tags, scripts and styles"""
+    return len(_TAGS_AND_SCRIPTS.sub(' ', html_content).split())
+
+
+def _stripped_length(text: str) -> int:
+    """len(text.strip()) without copying the text"""
+    start = _LEADING_SPACE.match(text).end()
+    end = len(text)
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return end - start
+
+
+class ScrapeError(Exception):
+    """Scraping failed; `reason` is the classify_response code behind it"""
+
+    def __init__(self, message: str, reason: str = None):
+        super().__init__(message)
+        self.reason = reason
+
+
+def scrape_error_for(reason: str, status_code: int = None) -> ScrapeError:
+    """Build the user-facing error for a failed classification"""
+    if reason == REASON_NOT_FOUND:
+        message = f"Page not found ({status_code or 404}). Please check the URL."
+    elif reason == REASON_RATE_LIMITED:
+        message = "Too many requests (429). Website rate limiting detected."
+    elif reason == REASON_CHALLENGE:
+        message = "Website served an anti-bot challenge (Cloudflare/CAPTCHA)."
+    elif reason == REASON_BLOCKED and status_code in (401, 403):
+        message = f"Access Forbidden ({status_code}). Website is blocking our requests."
+    elif reason == REASON_SERVER_ERROR:
+        message = f"Server error ({status_code}). Website may be down."
+    elif reason == REASON_NOT_HTML:
+        message = "The URL did not return an HTML page."
+    elif reason == REASON_EMPTY:
+        message = "Website returned an empty page. It may have anti-bot protection."
+    else:
+        message = "All scraping methods failed. The website may have strong anti-bot protection."
+    return ScrapeError(message, reason)
+
+
+def classify_response(html_content: str, status_code: int = 200, headers=None, min_length: int = 150) -> str:
+    """
+    Decide whether a fetched page is real content or a block, from the
+    status code, response headers, challenge markup and page structure.
+    Returns one of the REASON_* codes.
+    """
+    headers = headers or {}
+    server = headers.get('Server', '').lower()
+    
+    if headers.get('cf-mitigated', '').lower() == 'challenge':
+        return REASON_CHALLENGE
+    if headers.get('x-amzn-waf-action', '').lower() in ('captcha', 'challenge'):
+        return REASON_CHALLENGE
+    if status_code == 429:
+        return REASON_RATE_LIMITED
+    if status_code in (404, 410):
+        return REASON_NOT_FOUND
+    if status_code in (403, 503) and 'cloudflare' in server:
+        return REASON_CHALLENGE
+    if status_code >= 500:
+        return REASON_SERVER_ERROR
+    if status_code >= 400:
+        return REASON_BLOCKED
+    
+    content_type = headers.get('Content-Type', '').lower()
+    if content_type and 'html' not in content_type and 'xml' not in content_type:
+        return REASON_NOT_HTML
+    
+    if not html_content or _stripped_length(html_content) < min_length:
+        return REASON_EMPTY
+    
+    title = _TITLE.search(html_content, 0, 8192)
+    if title:
+        title_text = " ".join(title.group(1).split())
+        if BLOCK_TITLE_PATTERN.fullmatch(title_text):
+            print(f"🚫 Blocking detected in title: {title_text}")
+            return REASON_BLOCKED
+        found = BLOCK_TITLE_MATCHER.search(html_content, title.start(1), title.end(1))
+        if found and _visible_words(html_content) < BLOCK_PAGE_MAX_WORDS:
+            print(f"🚫 Blocking detected in title: {found[1]}")
+            return REASON_BLOCKED
+    
+    # One pass for every challenge / JavaScript signal on the page
+    signals = {pattern for _, pattern in PAGE_SIGNAL_MATCHER.finditer(html_content)}
+    
+    if len(html_content) <= CHALLENGE_MAX_LENGTH:
+        for marker in CHALLENGE_MARKERS:
+            if marker in signals:
+                print(f"🚫 Challenge page detected: {marker}")
+                return REASON_CHALLENGE
+    
+    if CONTENT_MATCHER.search(html_content) is None:
+        return REASON_NOT_HTML
+    
+    if any(marker in signals for marker in JS_REQUIRED_MARKERS):
+        if _visible_words(html_content) < 100:
+            return REASON_JS_REQUIRED
+    
+    return REASON_OK
 
 def is_valid_content(html_content: str, min_length: int = 150) -> bool:
     """Enhanced content validation"""
-    if not html_content or len(html_content.strip()) < min_length:
+    return classify_response(html_content, min_length=min_length) in ACCEPTED_REASONS
+
+# Tags dropped when extracting the body, and again when cleaning it
+EXTRACT_REMOVED_TAGS = ["script", "style", "noscript"]
+CLEAN_REMOVED_TAGS = ["script", "style", "nav", "header", "footer", "aside", "meta", "link", "button", "form"]
+
+_BODY_TAG = re.compile(r'<body[\s>/]', re.I)
+
+# Cleaning modes for extract_and_clean
+CLEAN_MODE_TAGS = "tags"    # Drop layout tags, keep all remaining text
+CLEAN_MODE_MAIN = "main"    # Additionally keep only the main content region
+
+def _text_lines(elements) -> list:
+    """Stripped, non-empty text lines of the given elements in document order"""
+    lines = []
+    for element in elements:
+        for text in element.itertext():
+            for line in text.splitlines():
+                line = line.strip()
+                if line:
+                    lines.append(line)
+    return lines
+
+# Elements whose content lxml keeps as raw text but html.parser parses as markup
+_RAW_TEXT_TAGS = ("iframe", "xmp", "noembed", "noframes")
+_CDATA = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.S)
+_ENTITY = re.compile(r'&([a-zA-Z][-.a-zA-Z0-9]*);')
+
+class _BodyTagFound(Exception):
+    pass
+
+class _BodyTagFinder(HTMLParser):
+    """Stops at the first <body> start tag html.parser itself would see"""
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            raise _BodyTagFound()
+
+def _has_body_tag(html_content: str) -> bool:
+    """Whether extract_body_content would find a <body>; "<body" in a script or comment doesn't count"""
+    if not _BODY_TAG.search(html_content):
         return False
+    try:
+        finder = _BodyTagFinder(convert_charrefs=False)
+        finder.feed(html_content)
+        finder.close()
+    except _BodyTagFound:
+        return True
+    except Exception:
+        return True
+    return False
+
+def _entity_as_html_parser(match) -> str:
+    """Named entities decoded the way BeautifulSoup's html.parser builder does"""
+    name = match.group(1)
+    if name in name2codepoint:
+        return match.group(0)
+    character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+    if character is None:
+        # html.parser consumes the ';' of an unknown entity
+        return f"&amp;{name}"
+    return html_escape(character)
+
+def _prepare_for_lxml(html_content: str) -> str:
+    """Rewrite the source where lxml would read it differently from html.parser"""
+    if "<![CDATA[" in html_content:
+        # html.parser keeps CDATA as its own text node; lxml drops it as a comment
+        html_content = _CDATA.sub(lambda m: f"<span>{html_escape(m.group(1))}</span>", html_content)
+    if "&" in html_content:
+        html_content = _ENTITY.sub(_entity_as_html_parser, html_content)
+    return html_content
+
+def _drop_separated(element):
+    """
+    Remove an element but keep the text on either side as separate strings,
+    the way extract() leaves them in a BeautifulSoup tree
+    """
+    placeholder = lxml.etree.Comment()
+    placeholder.tail = element.tail
+    element.getparent().replace(element, placeholder)
+
+def _drop_removed(root, merged: list, separated: list):
+    """
+    Drop the tags extract_body_content removes before re-serialising (their
+    neighbouring text merges) and then those clean_body_content removes
+    (their neighbouring text stays apart)
+    """
+    for element in list(root.iter(*merged)):
+        element.drop_tree()
+    for element in list(root.iter(*separated)):
+        _drop_separated(element)
+
+def _reparse(element, text: str, merged: list, separated: list):
+    """Replace an element's raw text with that text parsed as markup"""
+    fragment = lxml.html.fragment_fromstring(text, create_parent="div")
+    _drop_removed(fragment, merged, separated)
+    element.text = None
+    element.append(fragment)
+
+def _match_html_parser(root, merged: list, separated: list):
+    """
+    Bring lxml's tree in line with what html.parser + get_text() produce:
+    <template> content is not document text, and markup inside <textarea>,
+    <iframe> and the other raw-text elements is parsed as elements rather
+    than kept as raw text.
+    """
+    for template in list(root.iter("template")):
+        _drop_separated(template)
+    for textarea in list(root.iter("textarea")):
+        # RCDATA: entities are already decoded, only tags are left to parse
+        if textarea.text and "<" in textarea.text:
+            _reparse(textarea, textarea.text, merged, separated)
+    for element in list(root.iter(*_RAW_TEXT_TAGS)):
+        if element.text and ("<" in element.text or "&" in element.text):
+            _reparse(element, element.text, merged, separated)
+
+def extract_and_clean(html_content: str, mode: str = CLEAN_MODE_TAGS) -> str:
+    """
+    Single-pass equivalent of clean_body_content(extract_body_content(html)).
+    Parses once with lxml, drops the unwanted tags and emits the stripped,
+    non-empty text lines. Falls back to the two-step path if lxml fails.
+    With mode=CLEAN_MODE_MAIN, only the main content region found by
+    find_main_content is kept, or the tag-mode text if it finds nothing.
+    """
+    if "\x00" in html_content:
+        # libxml2 turns NUL into U+FFFD; html.parser keeps it
+        return clean_body_content(extract_body_content(html_content))
+    try:
+        source = _prepare_for_lxml(html_content)
+        try:
+            document = lxml.html.document_fromstring(source)
+        except ValueError:
+            # lxml refuses str input carrying an <?xml encoding=...?> declaration
+            document = lxml.html.document_fromstring(source.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+        
+        # Without a <body> tag the two-step path cleans the whole document
+        if _has_body_tag(html_content):
+            root = document.body
+            merged = EXTRACT_REMOVED_TAGS
+        else:
+            root = document
+            merged = []
+        
+        _drop_removed(root, merged, CLEAN_REMOVED_TAGS)
+        _match_html_parser(root, merged, CLEAN_REMOVED_TAGS)
+        
+        if mode == CLEAN_MODE_MAIN:
+            main_lines = _text_lines(find_main_content(root))
+            if main_lines:
+                return "\n".join(main_lines)
+        return "\n".join(_text_lines([root]))
+    except Exception as e:
+        print(f"⚠️ Fast cleaning failed, using BeautifulSoup: {e}")
+        return clean_body_content(extract_body_content(html_content))
+
+# ======================
+# Main content extraction
+# ======================
+
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|page|post|text|blog|story', re.I)
+NEGATIVE_HINTS = re.compile(
+    r'sidebar|comment|footer|footnote|related|share|social|cookie|banner|advert|\bads?\b|promo|'
+    r'sponsor|menu|\bnav|breadcrumb|popup|modal|newsletter|subscribe|widget|masthead|meta|tags?\b',
+    re.I
+)
+PARAGRAPH_TAGS = {"p", "pre", "td", "blockquote"}
+BLOCK_TAGS = {"div", "section", "article", "main", "table", "ul", "ol", "dl", "p", "pre", "blockquote"}
+TAG_WEIGHTS = {
+    "article": 10, "main": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "ol": -3, "ul": -3, "dl": -3, "th": -5, "li": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5,
+}
+MIN_PARAGRAPH_CHARS = 25
+
+def _hint_weight(element) -> int:
+    """Class/id naming hints, readability style"""
+    names = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if NEGATIVE_HINTS.search(names):
+        weight -= 25
+    if POSITIVE_HINTS.search(names):
+        weight += 25
+    return weight
+
+def link_density(element) -> float:
+    """Share of an element's text that sits inside links"""
+    text_length = len(element.text_content())
+    if not text_length:
+        return 0.0
+    link_length = sum(len(a.text_content()) for a in element.iter("a"))
+    return link_length / text_length
+
+def _paragraphs(root):
+    """(element, score) for paragraph-like blocks with enough text"""
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        # A div without block children reads as a paragraph
+        is_paragraph = element.tag in PARAGRAPH_TAGS or (
+            element.tag == "div" and not any(child.tag in BLOCK_TAGS for child in element)
+        )
+        if not is_paragraph:
+            continue
+        text = element.text_content()
+        if len(text.strip()) < MIN_PARAGRAPH_CHARS:
+            continue
+        yield element, 1 + text.count(",") + min(len(text) // 100, 3)
+
+def find_main_content(root) -> list:
+    """
+    Pick the element(s) holding a page's main content by text density,
+    link density and tag/class hints. Paragraph-like blocks score their
+    parent fully and grandparent by half; the best candidate is returned
+    together with siblings that score close to it. Works on a copy of
+    root, so the caller's tree is left intact. Returns [root] when nothing
+    qualifies.
+    """
+    root = copy.deepcopy(root)
+    
+    # Wrappers of the best text stay, whatever their class names say
+    paragraphs = [(element, score) for element, score in _paragraphs(root) if link_density(element) < 0.5]
+    best_paragraph = max((score for _, score in paragraphs), default=0)
+    protected = set()
+    for element, score in paragraphs:
+        if score >= best_paragraph / 2:
+            protected.add(element)
+            protected.update(element.iterancestors())
+    
+    # Unlikely regions go first, unless their names also look like content
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str) or element is root or element.tag in ("article", "main"):
+            continue
+        if element in protected:
+            continue
+        names = f"{element.get('class', '')} {element.get('id', '')}"
+        if NEGATIVE_HINTS.search(names) and not POSITIVE_HINTS.search(names) and element.getparent() is not None:
+            element.drop_tree()
+    
+    scores = {}
+    def initial(element):
+        if element not in scores:
+            scores[element] = TAG_WEIGHTS.get(element.tag, 0) + _hint_weight(element)
+        return scores[element]
+    
+    for element, score in _paragraphs(root):
+        parent = element.getparent()
+        if parent is None:
+            continue
+        scores[parent] = initial(parent) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = initial(grandparent) + score / 2
+    
+    if not scores:
+        return [root]
+    
+    final = {element: score * (1 - link_density(element)) for element, score in scores.items()}
+    best = max(final, key=final.get)
+    if final[best] <= 0:
+        return [root]
+    
+    parent = best.getparent()
+    if parent is None:
+        return [best]
+    
+    threshold = max(10, final[best] * 0.2)
+    selected = []
+    for sibling in parent:
+        if sibling is best or final.get(sibling, 0) >= threshold:
+            selected.append(sibling)
+        elif sibling.tag == "p":
+            text = sibling.text_content()
+            if len(text) > 80 and link_density(sibling) < 0.25:
+                selected.append(sibling)
+    return selected
+
+class _StreamingTextTarget:
+    """lxml parser target that turns body text into cleaned lines as it is fed"""
+    
+    def __init__(self):
+        self.lines = []
+        self._node = []
+        self._skip_depth = 0
+        self._in_body = False
     
-    content_lower = html_content.lower()
+    def _flush(self):
+        # get_text() puts a line break between text nodes, so each node splits on its own
+        if self._node:
+            text = "".join(self._node)
+            self._node = []
+            for line in text.splitlines():
+                line = line.strip()
+                if line:
+                    self.lines.append(line)
     
-    # Blocking indicators
-    blocking_indicators = [
-        'access denied', 'cloudflare', 'captcha', 'security check',
-        'enable javascript', 'bot detected', 'permission denied',
-        'distil', 'incapsula', 'blocked', 'forbidden'
-    ]
+    def start(self, tag, attrib):
+        self._flush()
+        if tag == "body":
+            self._in_body = True
+        if self._skip_depth or tag in STREAM_REMOVED_TAGS:
+            self._skip_depth += 1
     
-    # Check for blocking pages
-    for indicator in blocking_indicators:
-        if indicator in content_lower:
-            print(f"🚫 Blocking detected: {indicator}")
-            return False
+    def end(self, tag):
+        self._flush()
+        if self._skip_depth:
+            self._skip_depth -= 1
     
-    # Check for actual content indicators
-    content_indicators = [
-        '<body', '<div', '<p', '<span', '<h1', '<h2', '<article', '<main'
-    ]
+    def data(self, text):
+        if self._in_body and not self._skip_depth:
+            self._node.append(text)
     
-    has_content = any(indicator in content_lower for indicator in content_indicators)
+    def comment(self, text):
+        self._flush()
     
-    return has_content
+    def close(self):
+        self._flush()
+
+STREAM_REMOVED_TAGS = set(EXTRACT_REMOVED_TAGS + CLEAN_REMOVED_TAGS)
+
+def stream_page_text(url: str, max_bytes: int = None, headers: dict = None, timeout: int = 20):
+    """
+    Download a page in chunks and yield cleaned body text lines as they arrive.
+    Stops reading at max_bytes (MAX_RESPONSE_BYTES by default), so memory stays
+    flat no matter how large the page is. Raises ScrapeError on HTTP errors.
+    """
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    max_bytes = max_bytes or MAX_RESPONSE_BYTES
+    
+    with scheduler.slot(url), _session.get(url, headers=headers or browser_headers(), timeout=timeout, stream=True) as response:
+        scheduler.record_response(url, response.status_code, response.headers)
+        if response.status_code >= 400:
+            raise scrape_error_for(classify_response("", response.status_code, response.headers), response.status_code)
+        
+        target = _StreamingTextTarget()
+        parser = None
+        pending = b""
+        size = 0
+        
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            chunk = chunk[:max_bytes - size]
+            size += len(chunk)
+            
+            if parser is None:
+                # Hold back the first bytes until the encoding is known
+                pending += chunk
+                encoding = sniff_encoding(response.headers, pending)
+                if encoding is None and len(pending) < 4096 and size < max_bytes:
+                    continue
+                parser = etree.HTMLParser(target=target, encoding=encoding or "utf-8")
+                chunk, pending = pending, b""
+            
+            parser.feed(chunk)
+            if target.lines:
+                yield from target.lines
+                target.lines = []
+            
+            if size >= max_bytes:
+                print(f"✂️ Stopped reading at {max_bytes:,} bytes: {url}")
+                break
+        
+        if parser is None:
+            if not pending:
+                return
+            parser = etree.HTMLParser(target=target, encoding=sniff_encoding(response.headers, pending, "utf-8"))
+            parser.feed(pending)
+        parser.close()
+        yield from target.lines
 
 def extract_body_content(html_content: str) -> str:
     """Extract body content from HTML"""
@@ -192,7 +1281,7 @@ def extract_body_content(html_content: str) -> str:
         soup = BeautifulSoup(html_content, "html.parser")
         
         # Remove script and style elements
-        for script in soup(["script", "style", "noscript"]):
+        for script in soup(EXTRACT_REMOVED_TAGS):
             script.extract()
             
         body_content = soup.body
@@ -209,7 +1298,7 @@ def clean_body_content(body_content: str) -> str:
         soup = BeautifulSoup(body_content, "html.parser")
 
         # Remove unwanted elements
-        for element in soup(["script", "style", "nav", "header", "footer", "aside", "meta", "link", "button", "form"]):
+        for element in soup(CLEAN_REMOVED_TAGS):
             element.extract()
 
         # Get clean text with better formatting
@@ -224,9 +1313,124 @@ def clean_body_content(body_content: str) -> str:
         print(f"⚠️ Error cleaning content: {e}")
         return body_content
 
-def split_dom_content(dom_content: str, max_length: int = 6000):
-    """Split content into chunks for processing"""
-    return [
-        dom_content[i : i + max_length]
-        for i in range(0, len(dom_content), max_length)
-    ]
+# Coarsest boundary first: paragraphs, lines, sentences, words
+_CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+def _split_to_fit(text: str, limit: int, separators: list) -> list:
+    """Break text into pieces of at most limit characters at the coarsest boundary available"""
+    if len(text) <= limit:
+        return [text]
+    if not separators:
+        return [text[i : i + limit] for i in range(0, len(text), limit)]
+    
+    separator, finer = separators[0], separators[1:]
+    if separator not in text:
+        return _split_to_fit(text, limit, finer)
+    
+    parts = text.split(separator)
+    pieces = []
+    for i, part in enumerate(parts):
+        # Keep the separator on the piece so chunks rejoin losslessly
+        if i < len(parts) - 1:
+            part += separator
+        pieces.extend(_split_to_fit(part, limit, finer))
+    return pieces
+
+def _pack_pieces(pieces, limit: int, overlap: int):
+    """Greedily fill chunks of up to limit characters from pieces, yielding each when complete"""
+    current, size = [], 0
+    for piece in pieces:
+        if current and size + len(piece) > limit:
+            chunk = "".join(current).strip()
+            if chunk:
+                yield chunk
+            
+            carried, carried_size = [], 0
+            for previous in reversed(current):
+                if carried_size + len(previous) > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous)
+            # The carried text must leave room for the new piece
+            while carried and carried_size + len(piece) > limit:
+                carried_size -= len(carried.pop(0))
+            current, size = carried, carried_size
+        
+        current.append(piece)
+        size += len(piece)
+    
+    if current:
+        chunk = "".join(current).strip()
+        if chunk:
+            yield chunk
+
+def split_dom_content(dom_content: str, max_length: int = 6000, max_tokens: int = None, overlap: int = 0):
+    """
+    Split content into chunks for processing.
+    Chunks break at paragraph, line, sentence or word boundaries and are filled
+    up to max_length characters, or to max_tokens estimated tokens when given.
+    With overlap, each chunk repeats up to that many trailing characters of
+    whole pieces from the previous chunk.
+    """
+    limit = chars_for_tokens(max_tokens) if max_tokens else max_length
+    overlap = min(overlap, limit // 2)
+    return list(_pack_pieces(_split_to_fit(dom_content, limit, _CHUNK_SEPARATORS), limit, overlap))
+
+def split_content_defined(dom_content: str, max_length: int = 6000, max_tokens: int = None):
+    """
+    Split like split_dom_content, but let the text choose the cut points:
+    once a chunk holds 7/8 of the limit, it ends after any piece whose hash
+    falls under a threshold proportional to the piece's length. An edit then
+    changes only the chunks around it, so unchanged text keeps the same
+    chunks between scrapes. Chunks end up about 90% full, so a page takes a
+    few more chunks than with split_dom_content.
+    """
+    limit = chars_for_tokens(max_tokens) if max_tokens else max_length
+    min_size = limit - limit // 8
+    # On average one cut per limit/16 characters past the minimum
+    spacing = max(limit // 16, 1)
+    
+    chunks = []
+    current, size = [], 0
+    for piece in _split_to_fit(dom_content, limit, _CHUNK_SEPARATORS):
+        if current and size + len(piece) > limit:
+            chunks.append("".join(current).strip())
+            current, size = [], 0
+        
+        current.append(piece)
+        size += len(piece)
+        digest = hashlib.blake2b(piece.strip().encode("utf-8"), digest_size=4).digest()
+        if size >= min_size and int.from_bytes(digest, "big") * spacing < len(piece) << 32:
+            chunks.append("".join(current).strip())
+            current, size = [], 0
+    
+    if current:
+        chunks.append("".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+def _line_pieces(lines, limit: int):
+    """
+    The pieces _split_to_fit makes of "\n".join(lines), one line at a time:
+    without blank lines the text splits at every line break, and only the
+    last line lacks its trailing newline.
+    """
+    previous = None
+    for line in lines:
+        if previous is not None:
+            yield from _split_to_fit(previous + "\n", limit, _CHUNK_SEPARATORS[2:])
+        previous = line
+    if previous is not None:
+        yield from _split_to_fit(previous, limit, _CHUNK_SEPARATORS[2:])
+
+def iter_chunks(lines, max_length: int = 6000, max_tokens: int = None, overlap: int = 0):
+    """
+    Incremental split_dom_content over an iterable of text lines, such as
+    stream_page_text output. Yields each chunk as soon as the next piece
+    shows it is complete, holding at most one chunk. For non-empty lines
+    without line breaks (what stream_page_text yields) the chunks are
+    exactly those of split_dom_content("\n".join(lines)); blank lines are
+    not treated as paragraph breaks.
+    """
+    limit = chars_for_tokens(max_tokens) if max_tokens else max_length
+    overlap = min(overlap, limit // 2)
+    yield from _pack_pieces(_line_pieces(lines, limit), limit, overlap)
@@ -0,0 +1,259 @@
+import re
+from collections import Counter
+
+import lxml.html
+from lxml import etree
+
+from relevance import query_terms, score_chunks, tokenize
+
+# Descriptions asking for rows of data rather than free text
+STRUCTURED_REQUEST = re.compile(
+    r"\b(tables?|tabular|rows?|columns?|csv|spreadsheet|lists?|listings?)\b", re.I
+)
+_COLUMNS_PHRASE = re.compile(r"\bcolumns?\s*(?:named|called|for|of|like|:)?\s*(.+?)(?:[.;\n]|$)", re.I)
+_COLUMN_SPLIT = re.compile(r"\s*(?:,|\band\b|&|/|\|)\s*", re.I)
+
+MIN_ROWS = 3                # Fewer rows than this is layout, not data
+MIN_GROUP_SHARE = 0.6       # Share of a parent's children that must look alike
+MIN_FIELD_SHARE = 0.5       # Share of cards a field must appear in to become a column
+SKIPPED_ANCESTORS = {"nav", "header", "footer", "aside", "form"}
+MIN_HEADER_MATCH = 0.5      # Share of the description's terms the column headers must contain
+
+
+def _text(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def _inside_skipped(element) -> bool:
+    """True for navigation and page chrome, or anything inside it"""
+    return element.tag in SKIPPED_ANCESTORS or any(
+        ancestor.tag in SKIPPED_ANCESTORS for ancestor in element.iterancestors()
+    )
+
+
+def _class_name(element) -> str:
+    return " ".join(sorted((element.get("class") or "").split()))
+
+
+def _label(element, position: int) -> str:
+    """Column name for a card field: its first class name, else its position"""
+    for name in (element.get("class") or "").split():
+        words = [w for w in re.split(r"[-_\s]+", name) if w and not w.isdigit()]
+        if words:
+            return " ".join(words).title()
+    return f"Field {position}"
+
+
+def _table_rows(table) -> list:
+    """Rows of a table's own cells (not nested tables), with colspans repeated"""
+    rows = []
+    for tr in table.iter("tr"):
+        if next(tr.iterancestors("table"), None) is not table:
+            continue
+        row, header_row = [], True
+        for cell in tr:
+            if cell.tag not in ("td", "th"):
+                continue
+            header_row = header_row and (cell.tag == "th" or tr.getparent().tag == "thead")
+            try:
+                span = min(max(int(cell.get("colspan", 1)), 1), 20)
+            except ValueError:
+                span = 1
+            row.extend([_text(cell)] * span)
+        if any(row):
+            rows.append((row, header_row))
+    return rows
+
+
+def extract_tables(root) -> list:
+    """Data tables as {"kind", "headers", "rows"}; layout tables are skipped"""
+    tables = []
+    for table in root.iter("table"):
+        if _inside_skipped(table):
+            continue
+        rows = _table_rows(table)
+        if not rows:
+            continue
+        headers = rows[0][0] if rows[0][1] else []
+        body = [row for row, _ in (rows[1:] if headers else rows)]
+        width = max(len(row) for row in body) if body else 0
+        if len(body) < MIN_ROWS - 1 or width < 2:
+            continue
+        headers = (headers + [f"Column {i}" for i in range(len(headers) + 1, width + 1)])[:width]
+        body = [row + [""] * (width - len(row)) for row in body]
+        tables.append({"kind": "table", "headers": headers, "rows": body})
+    return tables
+
+
+def _card_fields(item) -> dict:
+    """Text of a card keyed by each element's tag/class path inside the card"""
+    fields = {}
+    for element in item.iter():
+        if not isinstance(element.tag, str):
+            continue
+        own_text = " ".join(((element.text or "") + " ".join((child.tail or "") for child in element)).split())
+        if not own_text:
+            continue
+        path = []
+        node = element
+        while node is not item:
+            path.append(f"{node.tag}.{_class_name(node)}")
+            node = node.getparent()
+        key = "/".join(reversed(path))
+        fields.setdefault(key, (element, []))[1].append(own_text)
+    return fields
+
+
+def extract_repeated(root) -> list:
+    """Lists and card grids: parents whose children mostly share one tag and class"""
+    found = []
+    for parent in root.iter():
+        if not isinstance(parent.tag, str) or parent.tag in ("table", "thead", "tbody", "tr"):
+            continue
+        children = [child for child in parent if isinstance(child.tag, str)]
+        if len(children) < MIN_ROWS:
+            continue
+        signature, count = Counter((c.tag, _class_name(c)) for c in children).most_common(1)[0]
+        if count < MIN_ROWS or count < len(children) * MIN_GROUP_SHARE or _inside_skipped(parent):
+            continue
+
+        items = [c for c in children if (c.tag, _class_name(c)) == signature]
+        cards = [_card_fields(item) for item in items]
+        seen = Counter(key for card in cards for key in card)
+        order = []
+        for card in cards:
+            for key in card:
+                if key not in order and seen[key] >= len(cards) * MIN_FIELD_SHARE:
+                    order.append(key)
+        if not order:
+            continue
+
+        headers = []
+        for position, key in enumerate(order, start=1):
+            element = next(card[key][0] for card in cards if key in card)
+            name = "Item" if key == "" else _label(element, position)
+            while name in headers:
+                name = f"{name} {position}"
+            headers.append(name)
+        rows = [[" ".join(card[key][1]) if key in card else "" for key in order] for card in cards]
+        rows = [row for row in rows if any(row)]
+        if len(rows) >= MIN_ROWS:
+            found.append({"kind": "list", "headers": headers, "rows": rows})
+    return found
+
+
+def find_structures(body_html: str) -> list:
+    """All tables, lists and card grids in the DOM from extract_body_content"""
+    try:
+        root = lxml.html.fromstring(body_html)
+    except (ValueError, etree.ParserError):
+        return []
+    return extract_tables(root) + extract_repeated(root)
+
+
+def wants_structured(description: str) -> bool:
+    return bool(STRUCTURED_REQUEST.search(description or ""))
+
+
+def _structure_text(structure: dict) -> str:
+    return "\n".join(" ".join(row) for row in [structure["headers"]] + structure["rows"])
+
+
+def header_match(structure: dict, description: str) -> float:
+    """Share of the description's terms that appear in the structure's column headers"""
+    terms = query_terms(description or "")
+    if not terms:
+        return 0.0
+    header_words = set(tokenize(" ".join(structure["headers"])))
+    return sum(1 for term in terms if term in header_words) / len(terms)
+
+
+def best_structure(structures: list, description: str):
+    """
+    The structure that matches the description best, or None if none do.
+    Its headers must name at least MIN_HEADER_MATCH of what was asked for;
+    matching words in the rows alone (a "Jobs" link in a menu) is not enough.
+    """
+    coverage = [header_match(s, description) for s in structures]
+    candidates = [i for i in range(len(structures)) if coverage[i] >= MIN_HEADER_MATCH]
+    if not candidates:
+        return None
+    scores = score_chunks([_structure_text(s) for s in structures], description)
+    best = max(candidates, key=lambda i: (coverage[i], scores[i], len(structures[i]["rows"])))
+    return structures[best]
+
+
+def requested_columns(description: str) -> list:
+    """Column names spelled out in the description ("... with columns Name and Price")"""
+    match = _COLUMNS_PHRASE.search(description or "")
+    if not match:
+        return []
+    return [name.strip(" '\"`") for name in _COLUMN_SPLIT.split(match.group(1)) if name.strip(" '\"`")]
+
+
+def match_columns(headers: list, names: list):
+    """
+    Map requested names onto headers by shared words. Returns
+    [(header index, name)], or None when some name matches no header.
+    """
+    header_words = [set(tokenize(h)) for h in headers]
+    columns = []
+    for name in names:
+        words = set(tokenize(name))
+        overlap = [len(words & hw) for hw in header_words]
+        best = max(range(len(headers)), key=lambda i: overlap[i], default=None)
+        if best is None or overlap[best] == 0:
+            return None
+        columns.append((best, name))
+    return columns
+
+
+def project(structure: dict, columns: list) -> dict:
+    """Keep and rename the given (index, name) columns, in that order"""
+    return {
+        "kind": structure["kind"],
+        "headers": [name for _, name in columns],
+        "rows": [[row[i] for i, _ in columns] for row in structure["rows"]],
+    }
+
+
+def to_markdown(structure: dict) -> str:
+    def line(cells):
+        return "| " + " | ".join(cell.replace("|", "\\|") for cell in cells) + " |"
+
+    lines = [line(structure["headers"]), line(["---"] * len(structure["headers"]))]
+    lines.extend(line(row) for row in structure["rows"])
+    return "\n".join(lines)
+
+
+def extract_structured(body_html: str, description: str, label_columns=None):
+    """
+    Rule-based fast path: answer a table/list request straight from the DOM.
+    Columns named in the description are matched to headers locally; when
+    that fails, or no columns are named and the headers don't cover every
+    term asked for, label_columns(headers, sample_rows, description) (e.g. a
+    small model call) may return [(index, name)]. Returns a markdown table,
+    or None when the request should go to the model instead.
+    """
+    if not wants_structured(description):
+        return None
+    structure = best_structure(find_structures(body_html), description)
+    if structure is None:
+        return None
+
+    # Without named columns, the headers must cover everything asked for;
+    # a table that answers only part of the request is not returned as is
+    names = requested_columns(description)
+    if names:
+        columns = match_columns(structure["headers"], names)
+    else:
+        columns = None if header_match(structure, description) < 1.0 else []
+    if columns is None and label_columns is not None:
+        columns = label_columns(structure["headers"], structure["rows"][:3], description)
+    if columns is None:
+        return None
+    if columns:
+        structure = project(structure, columns)
+
+    print(f"⚡ Extracted {len(structure['rows'])} rows from a {structure['kind']} without the AI model")
+    return to_markdown(structure)
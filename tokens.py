@@ -0,0 +1,16 @@
+# Rough token accounting shared by chunking and quota handling.
+# Groq models use different tokenizers; ~4 characters per token is a
+# conservative average for English web text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a piece of text will use"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chars_for_tokens(tokens: int) -> int:
+    """Characters that fit in a token budget"""
+    return max(tokens, 0) * CHARS_PER_TOKEN